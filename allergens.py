@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------- DONNÉES RÉGLEMENTAIRES ----------------------
+INCO_ALLERGENS = [
+    "Gluten", "Crustacés", "Œufs", "Poissons", "Arachides", "Soja", "Lait",
+    "Fruits à coque", "Céleri", "Moutarde", "Sésame", "Anhydride sulfureux et sulfites",
+    "Lupin", "Mollusques",
+]
+# bit i du masque = INCO_ALLERGENS[i]
+ALLERGEN_BITS = {name: 1 << i for i, name in enumerate(INCO_ALLERGENS)}
+
+# ---------------------- TEXTE "a;b;c" ↔ MATRICE / MASQUE ----------------------
+def _clean(texts: pd.Series) -> pd.Series:
+    return texts.fillna("").astype(str).str.replace(r"\s*;\s*", ";", regex=True).str.strip(" ;")
+
+def allergen_matrix(texts: pd.Series) -> pd.DataFrame:
+    # matrice booléenne (une colonne par allergène INCO) à partir du texte "a;b;c" ;
+    # les libellés hors liste INCO n'y figurent pas (voir other_allergens)
+    dummies = _clean(texts).str.get_dummies(sep=";")
+    return dummies.reindex(columns=INCO_ALLERGENS, fill_value=0).astype(bool)
+
+def other_allergens(texts: pd.Series) -> pd.Series:
+    # libellés hors liste INCO ("Gluten;Noix" → "Noix"), à conserver quand le texte est réécrit
+    dummies = _clean(texts).str.get_dummies(sep=";")
+    others = dummies.drop(columns=[c for c in dummies.columns if c in INCO_ALLERGENS]).astype(bool)
+    text = pd.Series("", index=texts.index, dtype=object)
+    for name in others.columns:
+        text = text + np.where(others[name].to_numpy(), name + ";", "")
+    return text.str.rstrip(";")
+
+def matrix_to_text(matrix: pd.DataFrame, others: pd.Series = None) -> pd.Series:
+    # inverse de allergen_matrix, dans l'ordre réglementaire, suivi des libellés hors liste `others`
+    text = pd.Series("", index=matrix.index, dtype=object)
+    for name in INCO_ALLERGENS:
+        if name in matrix.columns:
+            text = text + np.where(matrix[name].fillna(False).astype(bool), name + ";", "")
+    if others is not None:
+        text = text + others.fillna("").to_numpy() + ";"
+    return text.str.strip(";")
+
+def allergen_mask(matrix: pd.DataFrame) -> np.ndarray:
+    # masque 14 bits par produit
+    bits = np.array([ALLERGEN_BITS[name] for name in INCO_ALLERGENS], dtype=np.uint16)
+    return (matrix[INCO_ALLERGENS].to_numpy(dtype=np.uint16) * bits).sum(axis=1).astype(np.uint16)
+
+def mask_of(allergens) -> int:
+    return sum(ALLERGEN_BITS[name] for name in allergens)
+
+def contains_any(mask: np.ndarray, allergens) -> np.ndarray:
+    # ex. contains_any(mask, ["Lait", "Œufs"]) : produits contenant du lait ou des œufs
+    return (mask & mask_of(allergens)) != 0
+
+def contains_all(mask: np.ndarray, allergens) -> np.ndarray:
+    wanted = mask_of(allergens)
+    return (mask & wanted) == wanted
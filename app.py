@@ -1,7 +1,24 @@
+import uuid
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime, date, time, timedelta
+from datetime import date, timedelta
+
+from allergens import (INCO_ALLERGENS, allergen_mask, allergen_matrix, contains_all, contains_any, matrix_to_text,
+                       other_allergens)
+from costing import (RECIPE_SUPPLIER, batch_recipe_costs, catalogue_margins, compute_margin, labor_cost_per_unit,
+                     overhead_allocation_per_unit, recipe_cost_rows, stale_recipe_rows, upsert_recipe_costs)
+from datastore import apply_editor_diff, csv_bytes, get_store, load_table, source_version
+from importer import IMPORT_TABLES, import_csv, read_header, suggest_mapping, upsert_frame
+from labels import label_table, labels_html, labels_zip
+from planning import shift_costs, weekly_totals
+from price_history import PRICE_TABLES, get_price_history, margin_history, month_ends, price_changes
+from price_index import get_price_index
+from production import explode_plan, offers_table, purchase_orders
+from scenarios import get_scenarios, parse_values
+from scheduling import auto_schedule
+from profiling import get_profiler
 
 # ---------------------- CONFIG ----------------------
 st.set_page_config(
@@ -10,13 +27,6 @@ st.set_page_config(
     layout="wide",
 )
 
-# ---------------------- DONNÉES RÉGLEMENTAIRES ----------------------
-INCO_ALLERGENS = [
-    "Gluten", "Crustacés", "Œufs", "Poissons", "Arachides", "Soja", "Lait",
-    "Fruits à coque", "Céleri", "Moutarde", "Sésame", "Anhydride sulfureux et sulfites",
-    "Lupin", "Mollusques",
-]
-
 # ---------------------- HELPERS ----------------------
 def fmt_eur(x):
     try:
@@ -24,96 +34,103 @@ def fmt_eur(x):
     except Exception:
         return x
 
-def hours_between(t1: time, t2: time) -> float:
-    dt1 = datetime.combine(date.today(), t1)
-    dt2 = datetime.combine(date.today(), t2)
-    if dt2 < dt1:  # passes midnight
-        dt2 += timedelta(days=1)
-    return (dt2 - dt1).seconds / 3600
-
-def labor_cost_per_unit(minutes_per_unit: float, hourly_rate: float, charges_pct: float, prime_h=0.0) -> float:
-    hours = minutes_per_unit / 60.0
-    return hours * (hourly_rate + prime_h) * (1 + charges_pct / 100)
-
-def overhead_allocation_per_unit(monthly_overheads: float, monthly_volume_units: float) -> float:
-    if monthly_volume_units <= 0:
-        return 0.0
-    return monthly_overheads / monthly_volume_units
-
-def compute_margin(purchase_ht: float, labor_unit: float, overhead_unit: float, tva_pct: float, selling_ttc: float) -> dict:
-    cost_ht = purchase_ht + labor_unit + overhead_unit
-    tva_rate = tva_pct / 100
-    selling_ht = selling_ttc / (1 + tva_rate) if (1 + tva_rate) else selling_ttc
-    margin_ht = selling_ht - cost_ht
-    margin_pct_on_sell = 0.0 if selling_ht == 0 else margin_ht / selling_ht * 100
-    markup_pct_on_cost = 0.0 if cost_ht == 0 else margin_ht / cost_ht * 100
-    return {
-        "Coût d'achat HT": purchase_ht,
-        "Coût MO / unité": labor_unit,
-        "Frais fixes / unité": overhead_unit,
-        "Coût de revient HT": cost_ht,
-        "Prix de vente HT": selling_ht,
-        "Prix de vente TTC": selling_ttc,
-        "Marge HT": margin_ht,
-        "% marge sur PV HT": margin_pct_on_sell,
-        "% coeff sur coût": markup_pct_on_cost,
-    }
+# Profilage optionnel (BOULANGERIE_PROFILE=1 ou ?profile=1) : durées par section, chargements,
+# éditeurs et exports, dans la barre latérale et dans profile_log.jsonl
+profiler = get_profiler()
 
 # ---------------------- INIT (charge depuis CSV si présents) ----------------------
-def load_csv_or_default(name, default_df):
-    try:
-        return pd.read_csv(name)
-    except Exception:
-        return default_df.copy()
-
-products = load_csv_or_default("products.csv", pd.DataFrame([
-    {"SKU": "BAG-TRAD", "Produit": "Baguette traditionnelle", "Catégorie": "Boulangerie", "Prix vente TTC": 1.20, "TVA %": 5.5, "Allergènes": "Gluten", "Stock": 120, "Seuil alerte": 30},
-    {"SKU": "CRO-BA", "Produit": "Croissant beurre", "Catégorie": "Viennoiserie", "Prix vente TTC": 1.10, "TVA %": 5.5, "Allergènes": "Gluten;Lait;Œufs", "Stock": 80, "Seuil alerte": 20},
-]))
-suppliers = load_csv_or_default("suppliers.csv", pd.DataFrame([
-    {"Fournisseur": "Moulins Dupont", "Contact": "dupont@moulins.fr", "Téléphone": "+33 1 23 45 67 89", "Délai (j)": 2},
-    {"Fournisseur": "Beurres de Normandie", "Contact": "ventes@beurres.fr", "Téléphone": "+33 2 12 34 56 78", "Délai (j)": 3},
-    {"Fournisseur": "Grossiste Paris", "Contact": "contact@grossiste.paris", "Téléphone": "+33 1 98 76 54 32", "Délai (j)": 1},
-]))
-supplier_prices = load_csv_or_default("supplier_prices.csv", pd.DataFrame([
-    {"SKU": "BAG-TRAD", "Fournisseur": "Moulins Dupont", "Unité": "pièce", "Prix HT": 0.35, "Qté / unité": 1.0, "MOQ": 50},
-    {"SKU": "BAG-TRAD", "Fournisseur": "Grossiste Paris", "Unité": "pièce", "Prix HT": 0.33, "Qté / unité": 1.0, "MOQ": 80},
-    {"SKU": "CRO-BA", "Fournisseur": "Beurres de Normandie", "Unité": "pièce", "Prix HT": 0.42, "Qté / unité": 1.0, "MOQ": 40},
-    {"SKU": "CRO-BA", "Fournisseur": "Grossiste Paris", "Unité": "pièce", "Prix HT": 0.45, "Qté / unité": 1.0, "MOQ": 60},
-]))
-ingredients = load_csv_or_default("ingredients.csv", pd.DataFrame([
-    {"Code ingrédient": "FARINE-T45", "Nom": "Farine T45", "Unité achat": "kg"},
-    {"Code ingrédient": "BEURRE-AOC", "Nom": "Beurre AOP", "Unité achat": "kg"},
-    {"Code ingrédient": "LEVURE-B", "Nom": "Levure boulangère", "Unité achat": "kg"},
-]))
-ingredient_prices = load_csv_or_default("ingredient_prices.csv", pd.DataFrame([
-    {"Code ingrédient": "FARINE-T45", "Fournisseur": "Moulins Dupont", "Prix HT / unité": 0.80, "Qté / unité": 1.0},
-    {"Code ingrédient": "FARINE-T45", "Fournisseur": "Grossiste Paris", "Prix HT / unité": 0.78, "Qté / unité": 1.0},
-    {"Code ingrédient": "BEURRE-AOC", "Fournisseur": "Beurres de Normandie", "Prix HT / unité": 7.20, "Qté / unité": 1.0},
-    {"Code ingrédient": "LEVURE-B", "Fournisseur": "Grossiste Paris", "Prix HT / unité": 3.50, "Qté / unité": 1.0},
-]))
-recipes = load_csv_or_default("recipes.csv", pd.DataFrame([
-    {"SKU": "BAG-TRAD", "Ingrédient": "FARINE-T45", "Qté par unité": 0.20, "Unité": "kg"},
-    {"SKU": "BAG-TRAD", "Ingrédient": "LEVURE-B", "Qté par unité": 0.005, "Unité": "kg"},
-    {"SKU": "CRO-BA", "Ingrédient": "FARINE-T45", "Qté par unité": 0.08, "Unité": "kg"},
-    {"SKU": "CRO-BA", "Ingrédient": "BEURRE-AOC", "Qté par unité": 0.035, "Unité": "kg"},
-]))
-overheads = load_csv_or_default("overheads.csv", pd.DataFrame([
-    {"Intitulé": "Loyer", "Montant mensuel €": 1500},
-    {"Intitulé": "Énergie", "Montant mensuel €": 600},
-    {"Intitulé": "Assurance", "Montant mensuel €": 120},
-    {"Intitulé": "Divers", "Montant mensuel €": 180},
-]))
-employees = load_csv_or_default("employees.csv", pd.DataFrame([
-    {"Employé": "Alice", "Rôle": "Boulangère", "Taux horaire €": 14.0, "Prime €/h": 0.0, "Charges %": 42.0},
-    {"Employé": "Bruno", "Rôle": "Vente", "Taux horaire €": 12.0, "Prime €/h": 0.5, "Charges %": 38.0},
-]))
-shifts = load_csv_or_default("shifts.csv", pd.DataFrame([
-    {"Date": (date.today()).isoformat(), "Employé": "Alice", "Rôle": "Boulangère", "Début": "05:00", "Fin": "13:00"},
-    {"Date": (date.today() + timedelta(days=1)).isoformat(), "Employé": "Bruno", "Rôle": "Vente", "Début": "08:00", "Fin": "14:00"},
-]))
+# Stockage SQLite optionnel (BOULANGERIE_DB) : les modifications des tableaux y sont écrites ligne à ligne.
+# Sans base, les modifications sont gardées dans la session (copies de travail) jusqu'à l'export CSV.
+store = get_store()
+
+def get_table(name: str) -> pd.DataFrame:
+    # chaque section ne charge que les tables dont elle a besoin (lecture CSV / SQLite en cache)
+    tables = st.session_state.setdefault("tables", {})
+    if store is None and name in tables:
+        return tables[name]
+    with profiler.span("chargement", name):
+        return load_table(name)
+
+def keep_table(name: str, df: pd.DataFrame):
+    if store is None:
+        st.session_state.setdefault("tables", {})[name] = df
+        st.session_state.setdefault("table_versions", {})[name] = uuid.uuid4().hex
+
+def table_versions(*names: str) -> tuple:
+    # clé des caches partagés : version de chaque table (copie de travail de la session, compteur SQLite ou
+    # signature du CSV), sans hacher leur contenu à chaque rerun
+    session = st.session_state.get("table_versions", {})
+    return tuple(("session", session[name]) if store is None and name in session else source_version(name)
+                 for name in names)
+
+def record_price_changes(name: str, old: pd.DataFrame, new: pd.DataFrame):
+    # tarifs modifiés → historique des prix (l'ancien prix n'est plus perdu)
+    history = get_table("price_history")
+    rows = price_changes(name, old, new, history)
+    if len(rows) == 0:
+        return
+    if store is not None:
+        store.apply_changes("price_history", added=rows.to_dict("records"))
+    else:
+        keep_table("price_history", pd.concat([history, rows], ignore_index=True))
+
+def save_changes(name: str, shown: pd.DataFrame, state: dict):
+    old = get_table(name)
+    if store is not None:
+        store.apply_editor_changes(name, shown, state)
+    else:
+        keep_table(name, apply_editor_diff(old, shown, state))
+    if name in PRICE_TABLES:
+        record_price_changes(name, old, get_table(name))
+
+def save_editor_changes(name: str, shown: pd.DataFrame, key: str):
+    save_changes(name, shown, st.session_state[key])
+
+def save_allergen_changes(shown: pd.DataFrame, key: str):
+    # grille d'allergènes (une case par allergène) → texte "a;b;c" des seules lignes modifiées
+    edited = st.session_state[key].get("edited_rows", {})
+    if edited:
+        rows = shown.iloc[[int(pos) for pos in edited]][INCO_ALLERGENS].copy()
+        for (pos, values), row_id in zip(edited.items(), rows.index):
+            for name, checked in values.items():
+                rows.at[row_id, name] = bool(checked)
+        # libellés hors liste INCO (absents de la grille) : conservés tels quels
+        others = other_allergens(get_table("products")["Allergènes"].reindex(rows.index))
+        texts = matrix_to_text(rows, others)
+        save_changes("products", shown, {"edited_rows": {pos: {"Allergènes": text} for pos, text in zip(edited, texts)}})
+
+def table_editor(name: str, df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    key = f"{name}_editor"
+    with profiler.span("éditeur", name):
+        return st.data_editor(df, num_rows="dynamic", use_container_width=True, key=key,
+                              on_change=save_editor_changes, args=(name, df, key), **kwargs)
+
+def import_upsert(name: str):
+    # reçoit les morceaux validés de l'import : écrits en base au fil de l'eau, sinon dans la copie de travail
+    before = get_table(name)
+
+    def upsert(rows: pd.DataFrame, keys: list):
+        if store is not None:
+            store.upsert_rows(name, rows, keys)
+        else:
+            keep_table(name, upsert_frame(get_table(name), rows, keys))
+        if name in PRICE_TABLES:
+            record_price_changes(name, before, rows)
+    return upsert
+
+def save_recipe_costs(old_prices: pd.DataFrame, costs: pd.Series) -> pd.DataFrame:
+    # remplace les lignes "Recette calculée" concernées (en base : uniquement ces lignes)
+    if store is not None:
+        store.apply_changes("supplier_prices", added=recipe_cost_rows(costs).to_dict("records"),
+                            deleted=old_prices.index[stale_recipe_rows(old_prices, costs)].tolist())
+    new_prices = upsert_recipe_costs(old_prices, costs)
+    keep_table("supplier_prices", new_prices)
+    return new_prices
 
 # ---------------------- UI ----------------------
+products = get_table("products")
+overheads = get_table("overheads")
+
 st.title("📊 Ma Boulangerie – Marges • Fournisseurs • Planning du personnel")
 st.caption("Calculez vos marges, comparez les tarifs fournisseurs par produit, suivez les stocks & allergènes, et gérez le planning hebdomadaire du personnel.")
 
@@ -128,66 +145,99 @@ with colC:
     monthly_overheads_total = float(overheads["Montant mensuel €"].sum()) if len(overheads) else 0
     st.metric("Frais fixes mensuels", fmt_eur(monthly_overheads_total))
 
-# Tabs
-onglets = st.tabs([
+# Navigation : seule la section affichée est exécutée à chaque rerun
+SECTIONS = [
     "📦 Catalogue & Fournisseurs",
     "🧾 Inventaire & Allergènes",
     "🥣 Ingrédients & Recettes",
     "💶 Prix & Marges",
+    "🏭 Production & Besoins",
     "🗓️ Planning du personnel",
     "⚙️ Paramètres • Import/Export",
-])
+]
+section = st.radio("Section", SECTIONS, horizontal=True, key="section", label_visibility="collapsed")
+profiler.checkpoint("En-tête & indicateurs")
 
 # ---------------------- TAB 0: Catalogue & Suppliers ----------------------
-with onglets[0]:
+if section == SECTIONS[0]:
+    suppliers = get_table("suppliers")
+    supplier_prices = get_table("supplier_prices")
+    ingredient_prices = get_table("ingredient_prices")
+
     st.subheader("Produits")
     st.markdown("Ajoutez vos produits, le prix de vente TTC, la TVA, les allergènes et les seuils de stock.")
-    products = st.data_editor(products, num_rows="dynamic", use_container_width=True, key="products_editor")
+    products = table_editor("products", products)
 
     st.divider()
     cols = st.columns(2)
     with cols[0]:
         st.subheader("Fournisseurs")
-        suppliers = st.data_editor(suppliers, num_rows="dynamic", use_container_width=True, key="suppliers_editor")
+        suppliers = table_editor("suppliers", suppliers)
     with cols[1]:
         st.subheader("Tarifs par produit")
         st.caption("Saisissez un tarif HT par fournisseur et par SKU (même produit).")
-        supplier_prices = st.data_editor(supplier_prices, num_rows="dynamic", use_container_width=True, key="supplier_prices_editor")
+        supplier_prices = table_editor("supplier_prices", supplier_prices)
 
     st.divider()
     st.subheader("Comparer les fournisseurs pour un produit")
     if len(products) > 0:
         sku = st.selectbox("Sélectionnez un produit (SKU)", products["SKU"].unique())
-        dfp = supplier_prices.query("SKU == @sku").copy()
+        price_index = get_price_index(table_versions("supplier_prices", "ingredient_prices", "suppliers"),
+                                      supplier_prices, ingredient_prices, suppliers)
+        dfp = price_index.products.offers(sku).copy()  # déjà trié par prix croissant
         if dfp.empty:
             st.info("Aucun tarif fournisseur renseigné pour ce SKU.")
         else:
-            best_idx = dfp["Prix HT"].astype(float).idxmin()
-            dfp.loc[best_idx, "Meilleur"] = "✅"
-            dfp_sorted = dfp.sort_values("Prix HT")
-            st.dataframe(dfp_sorted.style.format({"Prix HT": fmt_eur}).highlight_min(subset=["Prix HT"], color="#d1ffd6"), use_container_width=True)
+            dfp.loc[dfp.index[0], "Meilleur"] = "✅"
+            st.dataframe(dfp.style.format({"Prix HT": fmt_eur}).highlight_min(subset=["Prix HT"], color="#d1ffd6"), use_container_width=True)
     else:
         st.info("Ajoutez d'abord des produits.")
 
 # ---------------------- TAB 1: Inventory & Allergens ----------------------
-with onglets[1]:
+if section == SECTIONS[1]:
     st.subheader("Inventaire & Allergènes (INCO)")
     st.markdown("Mettez à jour les stocks et gérez les **14 allergènes réglementaires INCO**.")
-    df = products.copy()
-
-    # Allergènes : multipick avec INCO, serialisé en texte "a;b;c"
-    if "Allergènes" in df.columns:
-        for i, row in df.iterrows():
-            current = row.get("Allergènes", "")
-            if isinstance(current, str):
-                current_list = [x.strip() for x in current.split(";") if x.strip()]
-            elif isinstance(current, list):
-                current_list = current
-            else:
-                current_list = []
-            sel = st.multiselect(f"Allergènes – {row['Produit']} ({row['SKU']})", INCO_ALLERGENS, default=current_list, key=f"alg_{row['SKU']}")
-            df.at[i, "Allergènes"] = ";".join(sel)
-        products = df
+
+    # Allergènes : grille unique (une case par allergène INCO), paginée ; stockées en texte "a;b;c"
+    if "Allergènes" in products.columns:
+        matrix = allergen_matrix(products["Allergènes"])
+        mask = allergen_mask(matrix)
+        others = other_allergens(products["Allergènes"])
+        if (others != "").any():
+            listed = sorted(set(";".join(others[others != ""]).split(";")))
+            st.warning(f"Allergènes hors liste INCO (absents de la grille, conservés dans le texte du produit) : "
+                       f"{', '.join(listed)}.")
+
+        f1, f2, f3 = st.columns([2, 2, 1])
+        with f1:
+            search = st.text_input("Rechercher (SKU ou produit)", key="alg_search")
+        with f2:
+            wanted = st.multiselect("Contient", INCO_ALLERGENS, key="alg_filter")
+        with f3:
+            match_all = st.radio("Condition", ["au moins un", "tous"], key="alg_match", horizontal=True) == "tous"
+
+        keep = np.ones(len(products), dtype=bool)
+        if search:
+            hay = products["SKU"].astype(str) + " " + products["Produit"].astype(str)
+            keep &= hay.str.contains(search, case=False, regex=False).to_numpy()
+        if wanted:
+            keep &= contains_all(mask, wanted) if match_all else contains_any(mask, wanted)
+
+        grid = pd.concat([products[["SKU", "Produit"]], matrix], axis=1)[keep]
+        p1, p2 = st.columns([1, 3])
+        with p1:
+            page_size = st.selectbox("Lignes par page", [25, 50, 100, 200], index=1, key="alg_page_size")
+        n_pages = max(1, -(-len(grid) // page_size))
+        with p2:
+            page = st.selectbox("Page", range(1, n_pages + 1), key="alg_page")
+        shown = grid.iloc[(page - 1) * page_size: page * page_size]
+        st.caption(f"{len(grid)} produit(s) sur {len(products)} — page {page}/{n_pages}")
+        with profiler.span("éditeur", "allergènes"):
+            st.data_editor(
+                shown, use_container_width=True, hide_index=True, disabled=["SKU", "Produit"], key="allergens_editor",
+                column_config={name: st.column_config.CheckboxColumn(name) for name in INCO_ALLERGENS},
+                on_change=save_allergen_changes, args=(shown, "allergens_editor"),
+            )
 
     # Low stock
     if not {"Stock", "Seuil alerte"}.issubset(products.columns):
@@ -201,51 +251,113 @@ with onglets[1]:
             st.dataframe(low[["SKU","Produit","Stock","Seuil alerte"]], use_container_width=True)
 
     st.markdown("### Export étiquette INCO")
-    incotbl = products[["SKU","Produit","Allergènes"]].copy()
-    st.dataframe(incotbl, use_container_width=True)
+    st.caption("Allergènes déduits des recettes (recettes → ingrédients → allergènes), complétés par ceux déclarés sur le produit.")
+    e1, e2 = st.columns(2)
+    with e1:
+        label_source = st.radio("Étiquettes pour", ["Tout le catalogue", "Plan de production (CSV : SKU, Quantité)"], key="label_source")
+        plan_file, plan_sep = None, ";"
+        if label_source != "Tout le catalogue":
+            plan_file = st.file_uploader("Plan de production", type="csv", key="label_plan")
+            plan_sep = st.selectbox("Séparateur", [";", ",", "Tabulation"], key="label_plan_sep")
+            plan_sep = "\t" if plan_sep == "Tabulation" else plan_sep
+    with e2:
+        label_format = st.radio("Format", ["HTML imprimable (PDF)", "Archive ZIP de CSV"], key="label_format")
+    if st.button("🏷️ Générer les étiquettes"):
+        plan, plan_error = None, None
+        if plan_file is not None:
+            try:
+                plan = pd.read_csv(plan_file, sep=plan_sep, dtype=str, encoding="utf-8-sig")
+                plan.columns = plan.columns.str.strip()
+                if "SKU" not in plan.columns:
+                    plan_error = f"colonne « SKU » introuvable (colonnes lues : {', '.join(plan.columns)})"
+                elif "Quantité" in plan.columns:
+                    plan["Quantité"] = pd.to_numeric(plan["Quantité"].str.replace(",", ".", regex=False), errors="coerce")
+            except (ValueError, pd.errors.ParserError, UnicodeDecodeError) as e:
+                plan_error = str(e)
+        if plan_error is not None:
+            st.error(f"Plan de production illisible : {plan_error}")
+        else:
+            labels = label_table(products, get_table("recipes"), get_table("ingredients"), get_table("ingredient_allergens"), plan)
+            st.dataframe(labels[["SKU", "Produit", "Ingrédients", "Allergènes"]].head(200), use_container_width=True, hide_index=True)
+            with profiler.span("export", "étiquettes"):
+                if label_format.startswith("HTML"):
+                    st.download_button(f"📥 Télécharger {len(labels)} étiquette(s)", labels_html(labels),
+                                       file_name="etiquettes_inco.html", mime="text/html")
+                else:
+                    st.download_button(f"📥 Télécharger {len(labels)} étiquette(s)", labels_zip(labels),
+                                       file_name="etiquettes_inco.zip", mime="application/zip")
 
 # ---------------------- TAB 2: Ingredients & Recipes ----------------------
-with onglets[2]:
+if section == SECTIONS[2]:
+    suppliers = get_table("suppliers")
+    supplier_prices = get_table("supplier_prices")
+    ingredients = get_table("ingredients")
+    ingredient_prices = get_table("ingredient_prices")
+    recipes = get_table("recipes")
+    ingredient_allergens = get_table("ingredient_allergens")
+
     st.subheader("Ingrédients & Recettes (BOM)")
     c1, c2 = st.columns(2)
     with c1:
         st.markdown("**Catalogue ingrédients**")
-        ingredients = st.data_editor(ingredients, num_rows="dynamic", use_container_width=True, key="ingredients_editor")
+        ingredients = table_editor("ingredients", ingredients)
         st.markdown("**Tarifs ingrédients (HT)** — le calcul de recette prendra le **meilleur prix**.")
-        ingredient_prices = st.data_editor(ingredient_prices, num_rows="dynamic", use_container_width=True, key="ingredient_prices_editor")
+        ingredient_prices = table_editor("ingredient_prices", ingredient_prices)
+        st.markdown("**Allergènes par ingrédient** — utilisés pour les étiquettes INCO.")
+        ingredient_allergens = table_editor("ingredient_allergens", ingredient_allergens, column_config={
+            "Allergène": st.column_config.SelectboxColumn("Allergène", options=INCO_ALLERGENS)})
     with c2:
         st.markdown("**Recettes par produit (quantité d'ingrédient par unité produite)**")
-        recipes = st.data_editor(recipes, num_rows="dynamic", use_container_width=True, key="recipes_editor")
+        recipes = table_editor("recipes", recipes)
 
     st.divider()
     st.markdown("### Calcul du **coût matières HT** par produit")
 
-    best_price = (ingredient_prices
-                  .sort_values(["Code ingrédient","Prix HT / unité"])
-                  .groupby("Code ingrédient").first()["Prix HT / unité"].to_dict())
+    # coût de tout le catalogue en un seul passage (sous-recettes comprises), aux prix du jour
+    # ou aux prix en vigueur à une date passée (historique des prix)
+    asof = st.date_input("Prix en vigueur au", value=date.today(), max_value=date.today(), key="recipe_cost_asof")
+    current = asof >= date.today()
+    if current:
+        price_index = get_price_index(table_versions("supplier_prices", "ingredient_prices", "suppliers"),
+                                      supplier_prices, ingredient_prices, suppliers)
+        best_prices = price_index.ingredients.best_prices()
+    else:
+        history = get_price_history(table_versions("price_history", "ingredient_prices", "supplier_prices"),
+                                    get_table("price_history"), ingredient_prices, supplier_prices)
+        best_prices = history.best_prices_asof("Ingrédient", asof)
+        st.caption(f"Coûts valorisés aux prix du {asof.strftime('%d/%m/%Y')} : consultation seule, seuls les coûts "
+                   "aux prix du jour peuvent être enregistrés comme 'Recette calculée'.")
+    recipe_costs = batch_recipe_costs(recipes, best_prices)
 
     def cost_from_recipe(sku: str) -> float:
-        sub = recipes.query("SKU == @sku")
-        total = 0.0
-        for _, r in sub.iterrows():
-            p = best_price.get(r["Ingrédient"], 0.0)
-            q = float(r["Qté par unité"])
-            total += p * q
-        return total
+        cost = recipe_costs.get(sku, 0.0)
+        return 0.0 if pd.isna(cost) else float(cost)
+
+    if recipe_costs.isna().any():
+        st.warning("Recettes circulaires (coût non calculé) : " + ", ".join(recipe_costs[recipe_costs.isna()].index.astype(str)))
 
     if len(products):
         sku_sel = st.selectbox("Produit (SKU)", products["SKU"].tolist(), key="sku_recipe_calc")
         cm = cost_from_recipe(sku_sel)
         st.metric("Coût matières d'une unité (HT)", fmt_eur(cm))
-        if st.button("➡️ Enregistrer ce coût comme 'Recette calculée'"):
-            new_row = {"SKU": sku_sel, "Fournisseur": "Recette calculée", "Unité": "unité", "Prix HT": round(cm, 4), "Qté / unité": 1.0, "MOQ": 0}
-            sp = supplier_prices.copy()
-            sp = sp[~((sp["SKU"] == sku_sel) & (sp["Fournisseur"] == "Recette calculée"))]
-            supplier_prices = pd.concat([sp, pd.DataFrame([new_row])], ignore_index=True)
+        if st.button("➡️ Enregistrer ce coût comme 'Recette calculée'", disabled=not current):
+            supplier_prices = save_recipe_costs(supplier_prices, pd.Series({sku_sel: cm}))
             st.success("Coût matières appliqué ✔️ — sélectionnez 'Recette calculée' comme fournisseur dans l'onglet Marges.")
 
+        st.markdown("#### Coût matières – tout le catalogue")
+        catalogue_costs = products[["SKU", "Produit"]].merge(recipe_costs.reset_index(), on="SKU", how="inner")
+        st.dataframe(catalogue_costs, use_container_width=True, hide_index=True,
+                     column_config={"Coût matières HT": st.column_config.NumberColumn(format="%.4f €")})
+        if st.button("➡️ Calculer tous les produits (Recette calculée)", disabled=not current):
+            supplier_prices = save_recipe_costs(supplier_prices, recipe_costs[recipe_costs.index.isin(products["SKU"])])
+            st.success(f"{len(catalogue_costs)} coûts matières appliqués ✔️")
+
 # ---------------------- TAB 3: Pricing & Margins ----------------------
-with onglets[3]:
+if section == SECTIONS[3]:
+    suppliers = get_table("suppliers")
+    supplier_prices = get_table("supplier_prices")
+    ingredient_prices = get_table("ingredient_prices")
+
     st.subheader("Calculateur de marge par produit")
     if len(products) == 0:
         st.warning("Ajoutez au moins un produit dans l'onglet Catalogue.")
@@ -259,12 +371,14 @@ with onglets[3]:
             selling_ttc_default = float(product_row.get("Prix vente TTC", 0))
 
             st.markdown(f"**Produit :** {prod_name}")
-            suppliers_sku = supplier_prices.query("SKU == @sku")
+            price_index = get_price_index(table_versions("supplier_prices", "ingredient_prices", "suppliers"),
+                                          supplier_prices, ingredient_prices, suppliers)
+            suppliers_sku = price_index.products.offers(sku)
             if suppliers_sku.empty:
                 st.info("Renseignez un tarif fournisseur ou utilisez l'onglet Recettes pour calculer le coût matières.")
             else:
                 sup_choice = st.selectbox("Source du coût d'achat", suppliers_sku["Fournisseur"].unique(), key="sup_for_margin")
-                purchase_ht = float(suppliers_sku.set_index("Fournisseur").loc[sup_choice, "Prix HT"])  # HT par unité
+                purchase_ht = price_index.products.price(sku, sup_choice, default=0.0)  # HT par unité
 
                 st.markdown("**Paramètres de production**")
                 c1, c2, c3, c4 = st.columns(4)
@@ -321,8 +435,200 @@ with onglets[3]:
                 """
             )
 
-# ---------------------- TAB 4: Staff Scheduling ----------------------
-with onglets[4]:
+        st.divider()
+        st.subheader("Marges – tout le catalogue")
+        st.caption("Coût de revient et marge de chaque produit pour chaque source de coût d'achat, avec les mêmes paramètres de production pour tous.")
+        c1, c2, c3, c4, c5 = st.columns(5)
+        with c1:
+            cat_minutes = st.number_input("Minutes de MO / unité", min_value=0.0, step=1.0, value=3.0, key="cat_minutes")
+        with c2:
+            cat_rate = st.number_input("Taux horaire (€)", min_value=0.0, step=0.5, value=14.0, key="cat_rate")
+        with c3:
+            cat_charges = st.number_input("Charges employeur (%)", min_value=0.0, step=1.0, value=42.0, key="cat_charges")
+        with c4:
+            cat_prime = st.number_input("Prime €/h", min_value=0.0, step=0.1, value=0.0, key="cat_prime")
+        with c5:
+            cat_volume = st.number_input("Volume mensuel prévu (unités)", min_value=1, step=50, value=5000, key="cat_volume")
+
+        cat_labor = labor_cost_per_unit(cat_minutes, cat_rate, cat_charges, cat_prime)
+        cat_overhead = overhead_allocation_per_unit(float(overheads["Montant mensuel €"].sum()), cat_volume)
+        margins = catalogue_margins(products, supplier_prices, cat_labor, cat_overhead)
+        f1, f2, f3 = st.columns([2, 1, 1])
+        with f1:
+            search = st.text_input("Rechercher (SKU, produit, fournisseur)", key="cat_search")
+        with f2:
+            below_only = st.checkbox("Seulement sous la marge cible", key="cat_below_only")
+        with f3:
+            target_pct = st.number_input("Marge cible (% PV HT)", min_value=0.0, max_value=100.0, step=1.0, value=60.0, key="cat_target")
+
+        view = margins
+        if search:
+            hay = view["SKU"].astype(str) + " " + view["Produit"].astype(str) + " " + view["Fournisseur"].astype(str)
+            view = view[hay.str.contains(search, case=False, regex=False)]
+        if below_only:
+            view = view[view["% marge sur PV HT"] < target_pct]
+        st.caption(f"{len(view)} ligne(s) sur {len(margins)} — cliquez sur un en-tête de colonne pour trier.")
+        eur = st.column_config.NumberColumn(format="%.2f €")
+        st.dataframe(
+            view.sort_values("% marge sur PV HT"),
+            use_container_width=True, hide_index=True,
+            column_config={
+                "Coût d'achat HT": eur, "Coût de revient HT": eur, "Prix de vente HT": eur, "Marge HT": eur,
+                "% marge sur PV HT": st.column_config.NumberColumn(format="%.1f %%"),
+            },
+        )
+
+        st.divider()
+        st.subheader("Évolution sur 24 mois")
+        st.caption("Coût d'achat à chaque fin de mois (recette valorisée aux prix alors en vigueur, sinon meilleur tarif "
+                   "fournisseur) et marge correspondante, avec les paramètres ci-dessus et les prix de vente actuels.")
+        price_history = get_table("price_history")
+        history = get_price_history(table_versions("price_history", "ingredient_prices", "supplier_prices"),
+                                    price_history, ingredient_prices, supplier_prices)
+        purchase = history.purchase_costs(get_table("recipes"), month_ends(24), table_versions("recipes"))
+        evo_skus = st.multiselect("Produits", list(purchase.columns), default=list(purchase.columns[:3]), key="evo_skus")
+        if evo_skus:
+            evolution = margin_history(products, purchase[evo_skus], cat_labor, cat_overhead)
+            h1, h2 = st.columns(2)
+            with h1:
+                st.markdown("**Coût d'achat HT (€ / unité)**")
+                st.line_chart(evolution["Coût d'achat HT"])
+            with h2:
+                st.markdown("**% marge sur PV HT**")
+                st.line_chart(evolution["% marge sur PV HT"])
+        with st.expander("Historique des prix"):
+            st.caption("Chaque changement de tarif (saisie ou import) y est ajouté automatiquement, daté du jour.")
+            table_editor("price_history", price_history)
+
+        st.divider()
+        st.subheader("Scénarios – sensibilité des marges")
+        st.caption("Toutes les combinaisons des variations ci-dessous sont calculées pour tout le catalogue, avec les "
+                   "paramètres de production et la marge cible ci-dessus. Listes de valeurs séparées par « ; ».")
+        shocks_df = st.data_editor(
+            pd.DataFrame({"Libellé": ["Farine", "Beurre"], "Codes ou préfixes": ["FARINE", "BEURRE"], "Variations %": ["0;15", "0;30"]}),
+            num_rows="dynamic", use_container_width=True, hide_index=True, key="scn_shocks",
+        )
+        s1, s2, s3, s4, s5 = st.columns(5)
+        with s1:
+            scn_wage = st.text_input("Salaires (taux horaire) %", "0;2", key="scn_wage")
+        with s2:
+            scn_volume = st.text_input("Volume mensuel %", "-20;0;20", key="scn_volume")
+        with s3:
+            scn_tva_from = st.number_input("Taux de TVA concerné", min_value=0.0, step=0.5, value=5.5, key="scn_tva_from")
+        with s4:
+            scn_tva_to = st.text_input("Nouveaux taux de TVA", "5.5;10", key="scn_tva_to")
+        with s5:
+            scn_price = st.text_input("Prix de vente TTC %", "0", key="scn_price")
+
+        shocks = tuple(
+            (str(label), tuple(c.strip() for c in str(codes).split(";") if c.strip()), parse_values(values))
+            for label, codes, values in zip(shocks_df["Libellé"], shocks_df["Codes ou préfixes"], shocks_df["Variations %"])
+            if pd.notna(label) and str(label).strip()
+        )
+        definition = {
+            "shocks": shocks,
+            "wage": parse_values(scn_wage),
+            "volume": parse_values(scn_volume),
+            "tva": (scn_tva_from, parse_values(scn_tva_to, default=(scn_tva_from,))),
+            "price": parse_values(scn_price),
+            "labor": (cat_minutes, cat_rate, cat_charges, cat_prime),
+            "overheads": float(overheads["Montant mensuel €"].sum()),
+            "monthly_volume": cat_volume,
+        }
+        n_scenarios = int(np.prod([len(v) for _, _, v in shocks] + [len(definition[k]) for k in ["wage", "volume", "price"]]
+                                  + [len(definition["tva"][1])]))
+        st.caption(f"{n_scenarios} scénario(s) × {len(products)} produit(s)")
+        if n_scenarios > 20000:
+            st.warning("Trop de combinaisons : réduisez le nombre de valeurs par variation.")
+        else:
+            scn = get_scenarios(table_versions("products", "recipes", "supplier_prices", "ingredient_prices"),
+                                products, get_table("recipes"), supplier_prices, ingredient_prices,
+                                tuple(definition.items()))
+            summary = scn.summary(target_pct).sort_values(["Produits sous la cible", "Marge moyenne %"], ascending=[False, True])
+            pct = st.column_config.NumberColumn(format="%.1f %%")
+            st.dataframe(summary.head(500), use_container_width=True,
+                         column_config={"Marge moyenne %": pct, "Marge min %": pct})
+            dims = list(scn.grid.columns)
+            pick = st.selectbox(
+                "Détail du scénario", summary.index[:500], key="scn_pick",
+                format_func=lambda i: " • ".join(f"{d[:-2]} {scn.grid.at[i, d]:{'g' if d == 'TVA %' else '+g'}} %" for d in dims),
+            )
+            detail = scn.products(pick, target_pct).sort_values("% marge scénario")
+            st.metric("Produits sous la marge cible", f"{int(detail['Sous la cible'].sum())} / {len(detail)}")
+            st.dataframe(
+                detail.head(500).style.apply(
+                    lambda row: ["background-color: #ffd6d6" if row["Sous la cible"] else ""] * len(row), axis=1
+                ).format({"% marge actuelle": "{:.1f} %", "% marge scénario": "{:.1f} %", "Écart (pts)": "{:+.1f}",
+                          "Marge HT scénario": fmt_eur}),
+                use_container_width=True, hide_index=True,
+            )
+
+# ---------------------- TAB 4: Production & Requirements ----------------------
+if section == SECTIONS[4]:
+    suppliers = get_table("suppliers")
+    supplier_prices = get_table("supplier_prices")
+    ingredients = get_table("ingredients")
+    ingredient_prices = get_table("ingredient_prices")
+    recipes = get_table("recipes")
+    production_plan = get_table("production_plan")
+
+    st.subheader("Plan de production")
+    st.caption("Quantités à produire par jour et par SKU. Les SKU sans recette sont considérés comme des produits achetés.")
+    production_plan = table_editor("production_plan", production_plan)
+
+    cols = st.columns(2)
+    with cols[0]:
+        plan_start = st.date_input("Début de l'horizon", date.today(), key="plan_start")
+    with cols[1]:
+        plan_days = st.slider("Horizon (jours)", min_value=1, max_value=90, value=7, key="plan_days")
+
+    needs, bought_needs = explode_plan(production_plan, recipes, plan_start, plan_days)
+    price_index = get_price_index(table_versions("supplier_prices", "ingredient_prices", "suppliers"),
+                                  supplier_prices, ingredient_prices, suppliers)
+
+    st.divider()
+    st.markdown("### Besoins en ingrédients")
+    if needs.empty and bought_needs.empty:
+        st.info("Aucune production planifiée sur cet horizon.")
+    else:
+        names = ingredients.drop_duplicates("Code ingrédient").set_index("Code ingrédient")["Nom"]
+        totals = needs.sum().rename("Besoin brut").rename_axis("Code ingrédient").reset_index()
+        totals.insert(1, "Nom", totals["Code ingrédient"].map(names))
+        st.dataframe(totals, use_container_width=True, hide_index=True)
+        with st.expander("Détail par jour"):
+            st.dataframe(needs.rename(index=lambda d: d.date()), use_container_width=True)
+
+        ingredient_stock = (ingredients.set_index("Code ingrédient")["Stock"] if "Stock" in ingredients.columns
+                            else pd.Series(dtype="float64"))
+        product_stock = products.set_index("SKU")["Stock"] if "Stock" in products.columns else pd.Series(dtype="float64")
+        orders = pd.concat([
+            purchase_orders(needs, ingredient_stock,
+                            offers_table(price_index.ingredients.best_offers(), "Code ingrédient", "Prix HT / unité")),
+            purchase_orders(bought_needs, product_stock,
+                            offers_table(price_index.products.best_offers(RECIPE_SUPPLIER), "SKU", "Prix HT")),
+        ], ignore_index=True)
+
+        st.markdown("### Commandes suggérées")
+        if orders.empty:
+            st.success("Le stock couvre tout l'horizon ✅")
+        else:
+            if orders["En retard"].any():
+                st.warning(f"{int(orders['En retard'].sum())} commande(s) à passer avant aujourd'hui compte tenu du délai fournisseur.")
+            by_supplier = orders.groupby(orders["Fournisseur"].fillna("(sans tarif)"))["Montant HT"].sum().reset_index()
+            st.dataframe(by_supplier, use_container_width=True, hide_index=True,
+                         column_config={"Montant HT": st.column_config.NumberColumn(format="%.2f €")})
+            st.dataframe(orders, use_container_width=True, hide_index=True,
+                         column_config={"Prix HT": st.column_config.NumberColumn(format="%.4f €"),
+                                        "Montant HT": st.column_config.NumberColumn(format="%.2f €")})
+            with profiler.span("export", "commandes"):
+                st.download_button("📥 Exporter les commandes (CSV)", orders.to_csv(index=False).encode("utf-8"),
+                                   file_name=f"commandes_{plan_start.isoformat()}.csv", mime="text/csv")
+
+# ---------------------- TAB 5: Staff Scheduling ----------------------
+if section == SECTIONS[5]:
+    employees = get_table("employees")
+    shifts = get_table("shifts")
+
     st.subheader("Planning hebdomadaire")
     # Ajout rapide
     cols = st.columns(5)
@@ -340,67 +646,187 @@ with onglets[4]:
 
     if st.button("➕ Ajouter shift (lundi)"):
         new_row = {"Date": week_monday.isoformat(), "Employé": emp_sel, "Rôle": role, "Début": start_str, "Fin": end_str}
-        shifts = pd.concat([shifts, pd.DataFrame([new_row])], ignore_index=True)
+        if store is not None:
+            # relu depuis la base : l'index doit rester l'identifiant SQLite des lignes pour l'éditeur
+            store.apply_changes("shifts", added=[new_row])
+            shifts = get_table("shifts")
+        else:
+            shifts = pd.concat([shifts, pd.DataFrame([new_row])], ignore_index=True)
+            keep_table("shifts", shifts)
         st.success("Shift ajouté ✔️")
 
-    # Filtre semaine
+    # Filtre semaine + heures & coûts (simple: taux horaire + prime/h, charges %), calculés en colonnes
     week_end = week_monday + timedelta(days=6)
-    df_shifts = shifts.copy()
-    try:
-        df_shifts["Date_dt"] = pd.to_datetime(df_shifts["Date"]).dt.date
-    except Exception:
-        df_shifts["Date_dt"] = week_monday  # fallback
-    mask = (df_shifts["Date_dt"] >= week_monday) & (df_shifts["Date_dt"] <= week_end)
-    df_shifts = df_shifts[mask].copy()
+    df_display = shift_costs(shifts, employees, week_monday, week_end)
 
-    # Calcul heures & coûts (simple: taux horaire + prime/h, charges %)
-    emp_map = employees.set_index("Employé").to_dict(orient="index")
-    def calc_hours_and_cost(row):
-        try:
-            h1 = datetime.strptime(str(row["Début"]), "%H:%M").time()
-            h2 = datetime.strptime(str(row["Fin"]), "%H:%M").time()
-            hrs = hours_between(h1, h2)
-        except Exception:
-            hrs = 0.0
-        emp = row.get("Employé")
-        taux = float(emp_map.get(emp, {}).get("Taux horaire €", 0.0))
-        prime = float(emp_map.get(emp, {}).get("Prime €/h", 0.0))
-        charges = float(emp_map.get(emp, {}).get("Charges %", 0.0))
-        cost = hrs * (taux + prime) * (1 + charges/100.0)
-        return pd.Series({"Heures": round(hrs,2), "Coût chargé €": round(cost,2)})
-
-    if not df_shifts.empty:
-        extras = df_shifts.apply(calc_hours_and_cost, axis=1)
-        df_display = pd.concat([df_shifts.reset_index(drop=True), extras], axis=1)
-        st.data_editor(df_display.drop(columns=["Date_dt"]), num_rows="dynamic", use_container_width=True, key="shifts_editor")
+    if not df_display.empty:
+        table_editor("shifts", df_display, disabled=["Heures", "Coût chargé €"])
         st.metric("Heures totales (semaine)", f"{df_display['Heures'].sum():.2f} h")
         st.metric("Coût salarial chargé (semaine)", fmt_eur(df_display["Coût chargé €"].sum()))
-        st.download_button("📥 Exporter la semaine (CSV)", df_display.drop(columns=["Date_dt"]).to_csv(index=False).encode("utf-8"),
-                           file_name=f"planning_{week_monday.isoformat()}.csv", mime="text/csv")
+        with profiler.span("export", "planning semaine"):
+            st.download_button("📥 Exporter la semaine (CSV)", df_display.to_csv(index=False).encode("utf-8"),
+                               file_name=f"planning_{week_monday.isoformat()}.csv", mime="text/csv")
     else:
         st.info("Aucun shift cette semaine.")
 
-# ---------------------- TAB 5: Settings / Import Export ----------------------
-with onglets[5]:
+    st.divider()
+    st.markdown("### Synthèse hebdomadaire")
+    cols = st.columns([2, 1])
+    with cols[0]:
+        period = st.date_input("Période", (week_monday, week_end + timedelta(weeks=3)), key="shifts_period")
+    with cols[1]:
+        group_by = st.radio("Regrouper par", ["Employé", "Rôle"], horizontal=True, key="shifts_group_by")
+    if isinstance(period, (tuple, list)) and len(period) == 2:
+        costed = shift_costs(shifts, employees, period[0], period[1])
+        if costed.empty:
+            st.info("Aucun shift sur cette période.")
+        else:
+            st.dataframe(weekly_totals(costed, by=group_by), use_container_width=True, hide_index=True,
+                         column_config={"Coût chargé €": st.column_config.NumberColumn(format="%.2f €")})
+
+    st.divider()
+    st.markdown("### Planning automatique")
+    st.caption("Besoins en personnel par jour, rôle et créneau, disponibilités des employés (un employé sans ligne est "
+               "disponible tous les jours) et plafond d'heures par semaine (colonne « Heures max / sem. » des employés) : "
+               "le planning généré couvre le plus de besoins possible, au coût chargé le plus bas trouvé, avec un shift "
+               "par employé et par jour au plus. La recherche est heuristique : rapide, mais sans garantie d'optimum.")
+    a1, a2 = st.columns(2)
+    with a1:
+        st.caption("Besoins (Jour : Lundi … Dimanche)")
+        staffing = table_editor("staffing", get_table("staffing"))
+    with a2:
+        st.caption("Disponibilités")
+        availability = table_editor("availability", get_table("availability"))
+    g1, g2, g3 = st.columns(3)
+    with g1:
+        auto_start = st.date_input("À partir de la semaine du", week_monday, key="auto_start")
+        auto_start = auto_start - timedelta(days=auto_start.weekday())
+    with g2:
+        auto_weeks = st.number_input("Semaines", 1, 12, 1, key="auto_weeks")
+    with g3:
+        default_max = st.number_input("Heures max / sem. par défaut", 0.0, 60.0, 35.0, 1.0, key="auto_default_max")
+    if st.button("🧮 Générer le planning", key="auto_run"):
+        planned, missing = auto_schedule(staffing, employees, availability, auto_start, int(auto_weeks), default_max)
+        st.session_state["auto_result"] = (auto_start, int(auto_weeks), planned, missing)
+    result = st.session_state.get("auto_result")
+    if result is not None:
+        auto_start, auto_weeks, planned, missing = result
+        auto_end = auto_start + timedelta(weeks=auto_weeks) - timedelta(days=1)
+        preview = shift_costs(planned, employees)
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Shifts", len(preview))
+        m2.metric("Heures", f"{preview['Heures'].sum():.1f} h")
+        m3.metric("Coût salarial chargé", fmt_eur(preview["Coût chargé €"].sum()))
+        if len(missing):
+            st.warning(f"{len(missing)} poste(s) non couvert(s) : la recherche n'a pas trouvé comment les affecter sans "
+                       "dépasser un plafond d'heures ou une disponibilité. Résultat heuristique : vérifiez l'effectif, les "
+                       "disponibilités et les plafonds du rôle concerné.")
+            st.dataframe(missing, use_container_width=True, hide_index=True)
+        if not preview.empty:
+            st.dataframe(weekly_totals(preview), use_container_width=True, hide_index=True,
+                         column_config={"Coût chargé €": st.column_config.NumberColumn(format="%.2f €")})
+            with st.expander("Détail des shifts générés"):
+                st.dataframe(preview, use_container_width=True, hide_index=True)
+        if st.button(f"✅ Écrire dans le planning (remplace les shifts du {auto_start:%d/%m} au {auto_end:%d/%m})",
+                     key="auto_write"):
+            replaced = shift_costs(shifts, employees, auto_start, auto_end).index
+            if store is not None:
+                store.apply_changes("shifts", added=planned.to_dict("records"), deleted=list(replaced))
+            keep_table("shifts", pd.concat([shifts.drop(index=replaced), planned], ignore_index=True))
+            del st.session_state["auto_result"]
+            st.success(f"{len(planned)} shift(s) écrits dans le planning ✔️")
+
+# ---------------------- TAB 6: Settings / Import Export ----------------------
+if section == SECTIONS[6]:
+    employees = get_table("employees")
+
     st.subheader("Frais fixes (mensuels)")
-    overheads = st.data_editor(overheads, num_rows="dynamic", use_container_width=True, key="overheads_editor")
+    overheads = table_editor("overheads", overheads)
 
     st.subheader("Employés")
-    employees = st.data_editor(employees, num_rows="dynamic", use_container_width=True, key="employees_editor")
+    employees = table_editor("employees", employees)
+
+    st.divider()
+    st.markdown("### Importer un fichier volumineux (tarifs fournisseurs, historique des shifts)")
+    st.caption("Le fichier est lu par morceaux : les lignes valides sont ajoutées ou mettent à jour la ligne de même clé "
+               "(SKU/code + fournisseur, ou date + employé + début), les lignes invalides vont dans un rapport de rejet.")
+    imports = {"Tarifs produits": "supplier_prices", "Tarifs ingrédients": "ingredient_prices", "Shifts": "shifts"}
+    i1, i2, i3 = st.columns(3)
+    with i1:
+        imp_name = imports[st.selectbox("Table cible", list(imports), key="imp_table")]
+    with i2:
+        sep = st.selectbox("Séparateur", [";", ",", "Tabulation"], key="imp_sep")
+        sep = "\t" if sep == "Tabulation" else sep
+    with i3:
+        encoding = st.selectbox("Encodage", ["utf-8", "cp1252"], key="imp_encoding")
+    upload = st.file_uploader("Fichier CSV", type=["csv", "txt"], key="imp_file")
+    if upload is not None:
+        try:
+            preview = read_header(upload, sep, encoding)
+        except ValueError as e:
+            preview = None
+            st.error(f"Lecture impossible (séparateur ou encodage ?) : {e}")
+        if preview is not None:
+            st.dataframe(preview, use_container_width=True, hide_index=True)
+            st.caption("Correspondance des colonnes (colonnes du schéma ← colonnes du fichier)")
+            IGNORE = "— (absente)"
+            suggested = suggest_mapping(preview.columns, imp_name)
+            mapping = {}
+            map_cols = st.columns(len(suggested))
+            for col, (target, source) in zip(map_cols, suggested.items()):
+                options = [IGNORE] + list(preview.columns)
+                with col:
+                    choice = st.selectbox(target, options, index=options.index(source) if source is not None else 0,
+                                          key=f"imp_map_{imp_name}_{target}")
+                mapping[target] = None if choice == IGNORE else choice
+            constants = {}
+            if "Fournisseur" in mapping and mapping["Fournisseur"] is None:
+                # tarif d'un seul grossiste : le fournisseur n'est pas une colonne du fichier
+                constants["Fournisseur"] = st.selectbox("Fournisseur pour tout le fichier",
+                                                        get_table("suppliers")["Fournisseur"].dropna().unique(),
+                                                        key="imp_supplier")
+            missing = [c for c in IMPORT_TABLES[imp_name]["required"] if mapping.get(c) is None and c not in constants]
+            if missing:
+                st.warning("Colonnes obligatoires non associées : " + ", ".join(missing))
+            if st.button("📥 Importer", disabled=bool(missing)):
+                bar = st.progress(0.0, text="Import en cours…")
+                with profiler.span("import", imp_name):
+                    stats, rejected = import_csv(upload, imp_name, mapping, import_upsert(imp_name), constants, sep,
+                                                 encoding, progress=lambda done, text: bar.progress(done, text=text))
+                bar.progress(1.0, text="Import terminé")
+                st.success(f"{stats['lues']} ligne(s) lue(s) • {stats['importées']} importée(s) • "
+                           f"{stats['doublons']} doublon(s) (dernière ligne retenue) • {stats['rejetées']} rejetée(s)")
+                if len(rejected):
+                    st.warning("Lignes rejetées (200 premières) :")
+                    st.dataframe(rejected.head(200), use_container_width=True, hide_index=True)
+                    st.download_button("📥 Rapport de rejet (CSV)", rejected.to_csv(index=False).encode("utf-8"),
+                                       file_name=f"rejets_{imp_name}.csv", mime="text/csv")
 
     st.divider()
     st.markdown("### Exporter les données (CSV)")
-    for label, df, fname in [
-        ("Produits", products, "products.csv"),
-        ("Fournisseurs", suppliers, "suppliers.csv"),
-        ("Tarifs produits", supplier_prices, "supplier_prices.csv"),
-        ("Ingrédients", ingredients, "ingredients.csv"),
-        ("Tarifs ingrédients", ingredient_prices, "ingredient_prices.csv"),
-        ("Recettes", recipes, "recipes.csv"),
-        ("Employés", employees, "employees.csv"),
-        ("Frais fixes", overheads, "overheads.csv"),
-        ("Shifts", shifts, "shifts.csv"),
-    ]:
-        st.download_button(f"📥 Exporter {label}", df.to_csv(index=False).encode("utf-8"), file_name=fname, mime="text/csv")
+    # seule la table choisie est sérialisée (et mise en cache tant qu'elle ne change pas)
+    exports = {
+        "Produits": "products",
+        "Fournisseurs": "suppliers",
+        "Tarifs produits": "supplier_prices",
+        "Ingrédients": "ingredients",
+        "Tarifs ingrédients": "ingredient_prices",
+        "Recettes": "recipes",
+        "Allergènes ingrédients": "ingredient_allergens",
+        "Employés": "employees",
+        "Frais fixes": "overheads",
+        "Shifts": "shifts",
+        "Plan de production": "production_plan",
+        "Historique des prix": "price_history",
+        "Besoins en personnel": "staffing",
+        "Disponibilités": "availability",
+    }
+    label = st.selectbox("Table à exporter", list(exports), key="export_table")
+    name = exports[label]
+    table = get_table(name)
+    with profiler.span("export", name):
+        st.download_button(f"📥 Exporter {label}", csv_bytes(table_versions(name), table), file_name=f"{name}.csv", mime="text/csv")
 
 st.caption("Conseil : utilisez l'onglet **Recettes** pour générer automatiquement le coût matières, puis sélectionnez **Recette calculée** dans l'onglet **Marges**.")
+
+profiler.finish(section)
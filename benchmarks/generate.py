@@ -0,0 +1,195 @@
+"""Jeu de données synthétique de boulangerie, à l'échelle voulue.
+
+    python -m benchmarks.generate --skus 3000 --shifts 200000 --out bench_data/3k
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["Boulangerie", "Viennoiserie", "Pâtisserie", "Snacking", "Traiteur"]
+BASE_PRODUCTS = ["Baguette", "Pain de campagne", "Croissant", "Pain au chocolat", "Éclair", "Tarte", "Flan",
+                 "Sandwich", "Quiche", "Brioche", "Cookie", "Macaron", "Chausson", "Fougasse", "Financier"]
+BASE_INGREDIENTS = [("FARINE", "Farine", "kg"), ("BEURRE", "Beurre", "kg"), ("LEVURE", "Levure", "kg"),
+                    ("SUCRE", "Sucre", "kg"), ("OEUF", "Œufs", "pièce"), ("LAIT", "Lait", "L"),
+                    ("CHOCO", "Chocolat", "kg"), ("SEL", "Sel", "kg"), ("CREME", "Crème", "L"),
+                    ("AMANDE", "Poudre d'amande", "kg"), ("JAMBON", "Jambon", "kg"), ("FROMAGE", "Fromage", "kg")]
+ALLERGENS_BY_BASE = {"FARINE": "Gluten", "BEURRE": "Lait", "OEUF": "Œufs", "LAIT": "Lait", "CREME": "Lait",
+                     "AMANDE": "Fruits à coque", "FROMAGE": "Lait", "CHOCO": "Soja"}
+SUPPLIERS = ["Moulins Dupont", "Beurres de Normandie", "Grossiste Paris", "Metro Pro", "Primeurs Rungis",
+             "Laiterie Martin", "Chocolats Valrhona", "Épicerie Fine Lyon"]
+ROLES = ["Boulanger", "Pâtissier", "Vente", "Plonge", "Livreur"]
+SHIFT_SLOTS = [("04:00", "12:00"), ("05:00", "13:00"), ("07:00", "14:00"), ("13:00", "20:00"),
+               ("14:00", "21:00"), ("22:00", "06:00")]
+
+def generate(skus: int = 1000, shifts: int = 10000, employees: int = None, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    n_ing = max(len(BASE_INGREDIENTS), skus // 10)
+    n_emp = employees or max(2, min(500, skus // 25))
+
+    # ingrédients : variantes des ingrédients de base (FARINE-0007…)
+    base = np.arange(n_ing) % len(BASE_INGREDIENTS)
+    ing_codes = np.array([f"{BASE_INGREDIENTS[b][0]}-{i:04d}" for i, b in enumerate(base)])
+    ingredients = pd.DataFrame({
+        "Code ingrédient": ing_codes,
+        "Nom": [f"{BASE_INGREDIENTS[b][1]} {i}" for i, b in enumerate(base)],
+        "Unité achat": [BASE_INGREDIENTS[b][2] for b in base],
+        "Stock": rng.integers(0, 200, n_ing).astype(float),
+    })
+    ia_rows = [(code, ALLERGENS_BY_BASE[BASE_INGREDIENTS[b][0]]) for code, b in zip(ing_codes, base)
+               if BASE_INGREDIENTS[b][0] in ALLERGENS_BY_BASE]
+    ingredient_allergens = pd.DataFrame(ia_rows, columns=["Code ingrédient", "Allergène"])
+
+    n_sup = rng.integers(1, 4, n_ing)
+    ing_rep = np.repeat(np.arange(n_ing), n_sup)
+    ingredient_prices = pd.DataFrame({
+        "Code ingrédient": ing_codes[ing_rep],
+        "Fournisseur": rng.choice(SUPPLIERS, len(ing_rep)),
+        "Prix HT / unité": np.round(rng.uniform(0.5, 25.0, len(ing_rep)), 2),
+        "Qté / unité": rng.choice([1.0, 5.0, 25.0], len(ing_rep)),
+        "MOQ": rng.choice([0.0, 1.0, 2.0, 10.0], len(ing_rep)),
+    }).drop_duplicates(["Code ingrédient", "Fournisseur"])
+
+    # produits ; ~5 % sont des sous-recettes (pâtes, crèmes) réutilisées par d'autres
+    sku_codes = np.array([f"SKU-{i:06d}" for i in range(skus)])
+    n_sub = max(1, skus // 20)
+    products = pd.DataFrame({
+        "SKU": sku_codes,
+        "Produit": [f"{BASE_PRODUCTS[i % len(BASE_PRODUCTS)]} n°{i}" for i in range(skus)],
+        "Catégorie": rng.choice(CATEGORIES, skus),
+        "Prix vente TTC": np.round(rng.uniform(0.9, 35.0, skus), 2),
+        "TVA %": rng.choice([5.5, 10.0, 20.0], skus, p=[0.8, 0.15, 0.05]),
+        "Allergènes": "",
+        "Stock": rng.integers(0, 150, skus).astype(float),
+        "Seuil alerte": rng.integers(5, 40, skus).astype(float),
+    })
+
+    n_lines = rng.integers(3, 11, skus)
+    rec_sku = np.repeat(np.arange(skus), n_lines)
+    rec_ing = ing_codes[rng.integers(0, n_ing, len(rec_sku))].astype(object)
+    use_sub = (rng.random(len(rec_sku)) < 0.05) & (rec_sku >= n_sub)
+    rec_ing[use_sub] = sku_codes[rng.integers(0, n_sub, use_sub.sum())]
+    recipes = pd.DataFrame({
+        "SKU": sku_codes[rec_sku],
+        "Ingrédient": rec_ing,
+        "Qté par unité": np.round(rng.uniform(0.001, 0.3, len(rec_sku)), 4),
+        "Unité": "kg",
+    }).drop_duplicates(["SKU", "Ingrédient"])
+
+    n_sp = rng.integers(1, 5, skus)
+    sp_rep = np.repeat(np.arange(skus), n_sp)
+    supplier_prices = pd.DataFrame({
+        "SKU": sku_codes[sp_rep],
+        "Fournisseur": rng.choice(SUPPLIERS, len(sp_rep)),
+        "Unité": "pièce",
+        "Prix HT": np.round(rng.uniform(0.2, 12.0, len(sp_rep)), 2),
+        "Qté / unité": 1.0,
+        "MOQ": rng.choice([0, 20, 40, 60, 100], len(sp_rep)).astype(float),
+    }).drop_duplicates(["SKU", "Fournisseur"])
+
+    suppliers = pd.DataFrame({
+        "Fournisseur": SUPPLIERS,
+        "Contact": [f"contact@{s.lower().replace(' ', '-')}.fr" for s in SUPPLIERS],
+        "Téléphone": "+33 1 00 00 00 00",
+        "Délai (j)": rng.integers(1, 6, len(SUPPLIERS)),
+    })
+
+    emp_names = np.array([f"Employé {i:03d}" for i in range(n_emp)])
+    emp_roles = rng.choice(ROLES, n_emp)
+    employees_df = pd.DataFrame({
+        "Employé": emp_names,
+        "Rôle": emp_roles,
+        "Taux horaire €": np.round(rng.uniform(11.65, 22.0, n_emp), 2),
+        "Prime €/h": rng.choice([0.0, 0.5, 1.0, 2.0], n_emp),
+        "Charges %": np.round(rng.uniform(35.0, 45.0, n_emp), 1),
+        "Heures max / sem.": rng.choice([24.0, 35.0, 39.0], n_emp),
+    })
+
+    # besoins du planning automatique : deux créneaux par rôle et par jour, environ un quart de l'effectif
+    # du rôle sur chacun ; la moitié des employés ne donne des disponibilités que pour certains jours
+    week_days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+    per_role = pd.Series(emp_roles).value_counts()
+    staffing = pd.DataFrame([
+        {"Jour": day, "Rôle": role, "Début": start, "Fin": end, "Effectif": max(1, round(count / 4))}
+        for day in week_days for role, count in per_role.items() for start, end in [("05:00", "12:00"), ("13:00", "20:00")]
+    ])
+    partial = emp_names[: n_emp // 2]
+    free_days = rng.random((len(partial), len(week_days))) < 0.7
+    who_av, day_av = np.nonzero(free_days)
+    availability = pd.DataFrame({
+        "Employé": partial[who_av],
+        "Jour": np.array(week_days)[day_av],
+        "Début": "05:00",
+        "Fin": "21:00",
+    })
+
+    # shifts répartis sur les jours passés, jusqu'à aujourd'hui
+    n_days = max(7, shifts // max(1, n_emp // 2))
+    first_day = date.today() - timedelta(days=n_days - 1)
+    day_offsets = np.sort(rng.integers(0, n_days, shifts))
+    days = pd.Series(pd.date_range(first_day, periods=n_days).strftime("%Y-%m-%d"))
+    who = rng.integers(0, n_emp, shifts)
+    slot = rng.integers(0, len(SHIFT_SLOTS), shifts)
+    shifts_df = pd.DataFrame({
+        "Date": days.to_numpy()[day_offsets],
+        "Employé": emp_names[who],
+        "Rôle": emp_roles[who],
+        "Début": np.array([s for s, _ in SHIFT_SLOTS])[slot],
+        "Fin": np.array([e for _, e in SHIFT_SLOTS])[slot],
+    })
+
+    overheads = pd.DataFrame({
+        "Intitulé": ["Loyer", "Énergie", "Assurance", "Divers"],
+        "Montant mensuel €": [1500.0, 600.0, 120.0, 180.0],
+    })
+    plan_days = pd.date_range(date.today(), periods=7).strftime("%Y-%m-%d")
+    production_plan = pd.DataFrame({
+        "Date": np.repeat(plan_days, skus),
+        "SKU": np.tile(sku_codes, len(plan_days)),
+        "Quantité": rng.integers(0, 60, skus * len(plan_days)).astype(float),
+    })
+    production_plan = production_plan[production_plan["Quantité"] > 0]
+
+    # 24 mois d'historique des tarifs ingrédients (un changement par trimestre), finissant au prix courant
+    steps = 9
+    drift = np.cumprod(1 + rng.normal(0.01, 0.03, (len(ingredient_prices), steps)), axis=1)
+    history_prices = ingredient_prices["Prix HT / unité"].to_numpy()[:, None] * drift / drift[:, -1:]
+    quarters = pd.period_range(end=pd.Timestamp(date.today()).to_period("M"), periods=25, freq="M")[::3]
+    price_history = pd.DataFrame({
+        "Type": "Ingrédient",
+        "Code": np.repeat(ingredient_prices["Code ingrédient"].to_numpy(), steps),
+        "Fournisseur": np.repeat(ingredient_prices["Fournisseur"].to_numpy(), steps),
+        "Date d'effet": np.tile(quarters.to_timestamp().strftime("%Y-%m-%d"), len(ingredient_prices)),
+        "Prix HT": np.round(history_prices.ravel(), 2),
+    })
+
+    return {
+        "products": products, "suppliers": suppliers, "supplier_prices": supplier_prices,
+        "ingredients": ingredients, "ingredient_prices": ingredient_prices, "recipes": recipes,
+        "ingredient_allergens": ingredient_allergens, "overheads": overheads, "employees": employees_df,
+        "shifts": shifts_df, "production_plan": production_plan, "price_history": price_history,
+        "staffing": staffing, "availability": availability,
+    }
+
+def write(tables: dict, out: str):
+    os.makedirs(out, exist_ok=True)
+    for name, df in tables.items():
+        df.to_csv(os.path.join(out, f"{name}.csv"), index=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=1000, help="nombre de produits (100 à 100 000)")
+    parser.add_argument("--shifts", type=int, default=10000, help="nombre de shifts (jusqu'à plusieurs millions)")
+    parser.add_argument("--employees", type=int, default=None, help="nombre d'employés (défaut : selon --skus)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_data", help="dossier de sortie")
+    args = parser.parse_args(argv)
+    tables = generate(args.skus, args.shifts, args.employees, args.seed)
+    write(tables, args.out)
+    for name, df in tables.items():
+        print(f"{name:22s} {len(df):>10,d} lignes")
+
+if __name__ == "__main__":
+    main()
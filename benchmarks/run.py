@@ -0,0 +1,217 @@
+"""Mesure des calculs de l'application sur un jeu de données (temps et pic mémoire).
+
+    python -m benchmarks.run --data bench_data/3k --save bench_3k.json
+    python -m benchmarks.run --data bench_data/3k --baseline bench_3k.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+
+from costing import (batch_recipe_costs, best_ingredient_prices, catalogue_margins, compute_margin,
+                     labor_cost_per_unit, overhead_allocation_per_unit)
+from datastore import DTYPES
+from labels import label_table, labels_html
+from planning import shift_costs, weekly_totals
+from price_history import PriceHistory, margin_history, month_ends
+from price_index import PriceIndex
+from production import explode_plan
+from scenarios import run_scenarios
+from scheduling import auto_schedule
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+CACHED_LOAD_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from datastore import load_table
+for name in {names!r}:
+    load_table(name)
+"""
+
+def measure(fn, repeat: int = 3) -> dict:
+    # temps médian sur `repeat` exécutions, pic mémoire Python (tracemalloc) sur une exécution à part ;
+    # `fn.setup`, s'il existe, est appelé une fois avant, hors mesure
+    setup = getattr(fn, "setup", None)
+    if setup is not None:
+        setup()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"s": statistics.median(times), "peak_mb": peak / 2**20}
+
+def computations(data_dir: str) -> dict:
+    # chaque entrée : nom → fonction sans argument ; les tables sont lues une fois au préalable
+    path = lambda name: os.path.join(data_dir, f"{name}.csv")
+    t = {name: pd.read_csv(path(name), dtype=DTYPES.get(name)) for name in DTYPES if os.path.exists(path(name))}
+    products, supplier_prices, recipes = t["products"], t["supplier_prices"], t["recipes"]
+    index = PriceIndex(supplier_prices, t["ingredient_prices"], t["suppliers"])
+    best = best_ingredient_prices(t["ingredient_prices"])
+    skus = products["SKU"].head(200).tolist()
+    labor = labor_cost_per_unit(3.0, 14.0, 42.0)
+    overhead = overhead_allocation_per_unit(2400.0, 5000)
+    monday = date.today() - timedelta(days=date.today().weekday())
+
+    def supplier_comparison():
+        for sku in skus:
+            index.products.offers(sku)
+
+    def scalar_margins():
+        prices = index.products.best_prices()
+        for sku in skus:
+            compute_margin(float(prices.get(sku, 0.0)), labor, overhead, 5.5, 1.2)
+
+    def cold_load():
+        for name in t:
+            pd.read_csv(path(name), dtype=DTYPES.get(name))
+
+    # st.cache_data ne met rien en cache hors du runtime Streamlit : les lectures en cache sont mesurées
+    # dans un script AppTest, créé et exécuté une première fois (remplissage du cache) hors mesure ; les
+    # exécutions mesurées ne font que lire le cache (le surcoût d'une exécution AppTest, quelques ms, est inclus)
+    loader = None
+
+    def run_loader():
+        cwd = os.getcwd()
+        os.chdir(data_dir)
+        try:
+            loader.run()
+            if loader.exception:
+                raise RuntimeError(loader.exception[0].value)
+        finally:
+            os.chdir(cwd)
+
+    def warm_loader():
+        nonlocal loader
+        from streamlit.testing.v1 import AppTest
+        if loader is None:
+            loader = AppTest.from_string(CACHED_LOAD_SCRIPT.format(root=os.path.dirname(APP), names=list(t)),
+                                         default_timeout=600)
+            run_loader()
+
+    def cached_load():
+        run_loader()
+    cached_load.setup = warm_loader
+
+    def csv_export():
+        for df in t.values():
+            df.to_csv(index=False).encode("utf-8")
+
+    cases = {
+        "load_csv_cold": cold_load,
+        "load_csv_cached": cached_load,
+        "price_index_build": lambda: PriceIndex(supplier_prices, t["ingredient_prices"], t["suppliers"]),
+        "supplier_comparison_x200": supplier_comparison,
+        "recipe_costs_catalogue": lambda: batch_recipe_costs(recipes, best),
+        "compute_margin_scalar_x200": scalar_margins,
+        "catalogue_margins": lambda: catalogue_margins(products, supplier_prices, labor, overhead),
+        "shift_costs_week": lambda: shift_costs(t["shifts"], t["employees"], monday, monday + timedelta(days=6)),
+        "shift_costs_all": lambda: shift_costs(t["shifts"], t["employees"]),
+        "weekly_totals_all": lambda: weekly_totals(shift_costs(t["shifts"], t["employees"])),
+        "csv_export_all": csv_export,
+    }
+    if "production_plan" in t:
+        cases["explode_plan_90d"] = lambda: explode_plan(t["production_plan"], recipes, date.today(), 90)
+    if "ingredient_allergens" in t:
+        cases["labels_catalogue_html"] = lambda: labels_html(
+            label_table(products, recipes, t["ingredients"], t["ingredient_allergens"]))
+    scenario_grid_2160 = {
+        "shocks": (("Farine", ("FARINE",), (0, 5, 10, 15)), ("Beurre", ("BEURRE",), (0, 10, 20, 30))),
+        "wage": (0, 1, 2), "volume": (-20, -10, 0, 10, 20), "tva": (5.5, (5.5, 7, 10)), "price": (0, 2, 5),
+        "labor": (3.0, 14.0, 42.0, 0.0), "overheads": 2400.0, "monthly_volume": 5000,
+    }
+    cases["scenarios_2160"] = lambda: run_scenarios(products, recipes, supplier_prices, t["ingredient_prices"],
+                                                    scenario_grid_2160)
+    if "price_history" in t:
+        def margin_evolution():
+            history = PriceHistory(t["price_history"], t["ingredient_prices"], supplier_prices)
+            margin_history(products, history.purchase_costs(recipes, month_ends(24)), labor, overhead)
+        cases["margin_history_24m"] = margin_evolution
+    if "staffing" in t:
+        cases["auto_schedule_4w"] = lambda: auto_schedule(t["staffing"], t["employees"], t.get("availability", pd.DataFrame(
+            columns=DTYPES["availability"])), monday, 4)
+    return cases
+
+def app_rerun(data_dir: str) -> dict:
+    # exécution complète du script via AppTest, une fois par section
+    from streamlit.testing.v1 import AppTest
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    sys.path.insert(0, os.path.dirname(APP))
+    try:
+        at = AppTest.from_file(APP, default_timeout=600).run()
+        sections = at.radio(key="section").options
+        for i, section in enumerate(sections):
+            def rerun():
+                at.radio(key="section").set_value(section).run()
+            results[f"app_rerun_section_{i}"] = measure(rerun, repeat=2)
+            if at.exception:
+                results[f"app_rerun_section_{i}"]["error"] = at.exception[0].value
+    finally:
+        os.chdir(cwd)
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # lignes de comparaison ; une régression = plus lent que la référence de plus de `tolerance`
+    lines = []
+    for name, res in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            lines.append((name, res["s"], None, None, ""))
+            continue
+        ratio = res["s"] / ref["s"] if ref["s"] else float("inf")
+        flag = "RÉGRESSION" if ratio > 1 + tolerance else ("mieux" if ratio < 1 - tolerance else "")
+        lines.append((name, res["s"], ref["s"], ratio, flag))
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", required=True, help="dossier des CSV (voir benchmarks.generate)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="ne mesurer que ces calculs")
+    parser.add_argument("--no-app", action="store_true", help="ne pas mesurer les reruns complets (AppTest)")
+    parser.add_argument("--save", help="enregistrer les résultats (JSON) comme référence")
+    parser.add_argument("--baseline", help="comparer à une référence enregistrée avec --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="écart toléré avant de signaler (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, fn in computations(args.data).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(fn, args.repeat)
+        print(f"{name:30s} {results[name]['s'] * 1000:10.1f} ms {results[name]['peak_mb']:9.1f} Mo", flush=True)
+    if not args.no_app and not args.only:
+        for name, res in app_rerun(args.data).items():
+            results[name] = res
+            print(f"{name:30s} {res['s'] * 1000:10.1f} ms {res['peak_mb']:9.1f} Mo {res.get('error', '')}", flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"data": args.data, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"\n{'calcul':30s} {'actuel':>10s} {'référence':>10s} {'ratio':>7s}")
+        regressions = 0
+        for name, cur, ref, ratio, flag in compare(results, baseline, args.tolerance):
+            ref_txt = f"{ref * 1000:8.1f}ms" if ref is not None else "       —"
+            ratio_txt = f"{ratio:6.2f}x" if ratio is not None else "      —"
+            print(f"{name:30s} {cur * 1000:8.1f}ms {ref_txt:>10s} {ratio_txt} {flag}")
+            regressions += flag == "RÉGRESSION"
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+RECIPE_SUPPLIER = "Recette calculée"
+
+# ---------------------- MARGES (scalaires, tableaux NumPy ou Series) ----------------------
+def _is_scalar(*values) -> bool:
+    return all(np.ndim(v) == 0 for v in values)
+
+def _index_of(*values):
+    # index de la première Series rencontrée : les résultats vectorisés le conservent
+    for v in values:
+        if isinstance(v, pd.Series):
+            return v.index
+    return None
+
+def _div_or(num, den, fallback, valid):
+    # num / den là où `valid`, fallback ailleurs (élément par élément)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(valid, np.divide(np.asarray(num, dtype="float64"), np.asarray(den, dtype="float64")), fallback)
+    index = _index_of(num, den, fallback)
+    return pd.Series(out, index=index) if index is not None else out
+
+def labor_cost_per_unit(minutes_per_unit: float, hourly_rate: float, charges_pct: float, prime_h=0.0) -> float:
+    hours = minutes_per_unit / 60.0
+    return hours * (hourly_rate + prime_h) * (1 + charges_pct / 100)
+
+def overhead_allocation_per_unit(monthly_overheads: float, monthly_volume_units: float) -> float:
+    if _is_scalar(monthly_overheads, monthly_volume_units):
+        if monthly_volume_units <= 0:
+            return 0.0
+        return monthly_overheads / monthly_volume_units
+    return _div_or(monthly_overheads, monthly_volume_units, 0.0, np.asarray(monthly_volume_units) > 0)
+
+def compute_margin(purchase_ht: float, labor_unit: float, overhead_unit: float, tva_pct: float, selling_ttc: float) -> dict:
+    cost_ht = purchase_ht + labor_unit + overhead_unit
+    tva_rate = tva_pct / 100
+    if _is_scalar(purchase_ht, labor_unit, overhead_unit, tva_pct, selling_ttc):
+        selling_ht = selling_ttc / (1 + tva_rate) if (1 + tva_rate) else selling_ttc
+        margin_ht = selling_ht - cost_ht
+        margin_pct_on_sell = 0.0 if selling_ht == 0 else margin_ht / selling_ht * 100
+        markup_pct_on_cost = 0.0 if cost_ht == 0 else margin_ht / cost_ht * 100
+    else:
+        selling_ht = _div_or(selling_ttc, 1 + tva_rate, selling_ttc, np.asarray(1 + tva_rate) != 0)
+        margin_ht = selling_ht - cost_ht
+        margin_pct_on_sell = _div_or(margin_ht * 100, selling_ht, 0.0, np.asarray(selling_ht) != 0)
+        markup_pct_on_cost = _div_or(margin_ht * 100, cost_ht, 0.0, np.asarray(cost_ht) != 0)
+    return {
+        "Coût d'achat HT": purchase_ht,
+        "Coût MO / unité": labor_unit,
+        "Frais fixes / unité": overhead_unit,
+        "Coût de revient HT": cost_ht,
+        "Prix de vente HT": selling_ht,
+        "Prix de vente TTC": selling_ttc,
+        "Marge HT": margin_ht,
+        "% marge sur PV HT": margin_pct_on_sell,
+        "% coeff sur coût": markup_pct_on_cost,
+    }
+
+def catalogue_margins(products: pd.DataFrame, supplier_prices: pd.DataFrame, labor_unit, overhead_unit) -> pd.DataFrame:
+    # une ligne par produit × source de coût d'achat, calculée en un seul passage vectorisé
+    df = products[["SKU", "Produit", "TVA %", "Prix vente TTC"]].merge(
+        supplier_prices[["SKU", "Fournisseur", "Prix HT"]], on="SKU", how="inner")
+    res = compute_margin(
+        pd.to_numeric(df["Prix HT"], errors="coerce").fillna(0.0),
+        labor_unit,
+        overhead_unit,
+        pd.to_numeric(df["TVA %"], errors="coerce").fillna(0.0),
+        pd.to_numeric(df["Prix vente TTC"], errors="coerce").fillna(0.0),
+    )
+    return pd.DataFrame({
+        "SKU": df["SKU"],
+        "Produit": df["Produit"],
+        "Fournisseur": df["Fournisseur"],
+        "Coût d'achat HT": res["Coût d'achat HT"],
+        "Coût de revient HT": res["Coût de revient HT"],
+        "Prix de vente HT": res["Prix de vente HT"],
+        "Marge HT": res["Marge HT"],
+        "% marge sur PV HT": res["% marge sur PV HT"],
+    })
+
+# ---------------------- COÛT MATIÈRES (recettes) ----------------------
+def best_ingredient_prices(ingredient_prices: pd.DataFrame) -> pd.Series:
+    # meilleur prix HT par code ingrédient (index : Code ingrédient)
+    prices = pd.to_numeric(ingredient_prices["Prix HT / unité"], errors="coerce")
+    return prices.groupby(ingredient_prices["Code ingrédient"]).min().dropna()
+
+def batch_recipe_costs(recipes: pd.DataFrame, best_prices: pd.Series) -> pd.Series:
+    # Coût matières HT d'une unité pour chaque SKU ayant une recette, à partir du meilleur prix
+    # par code ingrédient (best_ingredient_prices ou PriceIndex.ingredients.best_prices()).
+    # Un ingrédient qui possède lui-même une recette (pâte, crème…) est valorisé au coût de
+    # cette sous-recette : les SKU sont calculés niveau par niveau, dans l'ordre topologique.
+    # Les SKU pris dans un cycle de recettes restent à NaN.
+    rec = pd.DataFrame({
+        "SKU": recipes["SKU"],
+        "Ingrédient": recipes["Ingrédient"],
+        "Qté": pd.to_numeric(recipes["Qté par unité"], errors="coerce").fillna(0.0),
+    }).dropna(subset=["SKU"])
+    all_skus = pd.Index(rec["SKU"].unique())
+    sub_lines = rec[rec["Ingrédient"].isin(all_skus)]
+
+    costs = pd.Series(dtype="float64")
+    while len(costs) < len(all_skus):
+        todo = all_skus.difference(costs.index)
+        blocked = sub_lines.loc[~sub_lines["Ingrédient"].isin(costs.index), "SKU"].unique()
+        ready = todo.difference(blocked)
+        if ready.empty:  # cycle
+            costs = pd.concat([costs, pd.Series(float("nan"), index=todo)])
+            break
+        lines = rec[rec["SKU"].isin(ready)]
+        unit_price = lines["Ingrédient"].map(costs).fillna(lines["Ingrédient"].map(best_prices)).fillna(0.0)
+        level = (unit_price * lines["Qté"]).groupby(lines["SKU"]).sum()
+        costs = pd.concat([costs, level])
+    costs.index.name = "SKU"
+    return costs.rename("Coût matières HT")
+
+def recipe_cost_rows(costs: pd.Series) -> pd.DataFrame:
+    # lignes "Recette calculée" au format supplier_prices
+    costs = costs.dropna()
+    return pd.DataFrame({
+        "SKU": costs.index,
+        "Fournisseur": RECIPE_SUPPLIER,
+        "Unité": "unité",
+        "Prix HT": costs.round(4).to_numpy(),
+        "Qté / unité": 1.0,
+        "MOQ": 0,
+    })
+
+def stale_recipe_rows(supplier_prices: pd.DataFrame, costs: pd.Series) -> pd.Series:
+    # masque des lignes "Recette calculée" existantes pour les SKU recalculés
+    return supplier_prices["SKU"].isin(costs.dropna().index) & (supplier_prices["Fournisseur"] == RECIPE_SUPPLIER)
+
+def upsert_recipe_costs(supplier_prices: pd.DataFrame, costs: pd.Series) -> pd.DataFrame:
+    # remplace les lignes "Recette calculée" des SKU concernés par les coûts fournis
+    new_rows = recipe_cost_rows(costs)
+    sp = supplier_prices[~stale_recipe_rows(supplier_prices, costs)]
+    return pd.concat([sp, new_rows], ignore_index=True)
@@ -0,0 +1,223 @@
+import hashlib
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from sqlite_store import SQLiteStore
+
+# ---------------------- SCHÉMAS ----------------------
+# Types explicites par fichier : pandas n'a pas à inférer les types à chaque lecture.
+DTYPES = {
+    "products": {"SKU": "str", "Produit": "str", "Catégorie": "str", "Prix vente TTC": "float64", "TVA %": "float64",
+                 "Allergènes": "str", "Stock": "float64", "Seuil alerte": "float64"},
+    "suppliers": {"Fournisseur": "str", "Contact": "str", "Téléphone": "str", "Délai (j)": "Int64"},
+    "supplier_prices": {"SKU": "str", "Fournisseur": "str", "Unité": "str", "Prix HT": "float64", "Qté / unité": "float64",
+                        "MOQ": "float64"},
+    "ingredients": {"Code ingrédient": "str", "Nom": "str", "Unité achat": "str", "Stock": "float64"},
+    "ingredient_prices": {"Code ingrédient": "str", "Fournisseur": "str", "Prix HT / unité": "float64",
+                          "Qté / unité": "float64", "MOQ": "float64"},
+    "recipes": {"SKU": "str", "Ingrédient": "str", "Qté par unité": "float64", "Unité": "str"},
+    "ingredient_allergens": {"Code ingrédient": "str", "Allergène": "str"},
+    "production_plan": {"Date": "str", "SKU": "str", "Quantité": "float64"},
+    "price_history": {"Type": "str", "Code": "str", "Fournisseur": "str", "Date d'effet": "str", "Prix HT": "float64"},
+    "overheads": {"Intitulé": "str", "Montant mensuel €": "float64"},
+    "employees": {"Employé": "str", "Rôle": "str", "Taux horaire €": "float64", "Prime €/h": "float64",
+                  "Charges %": "float64", "Heures max / sem.": "float64"},
+    "shifts": {"Date": "str", "Employé": "str", "Rôle": "str", "Début": "str", "Fin": "str"},
+    "staffing": {"Jour": "str", "Rôle": "str", "Début": "str", "Fin": "str", "Effectif": "Int64"},
+    "availability": {"Employé": "str", "Jour": "str", "Début": "str", "Fin": "str"},
+}
+
+# ---------------------- DONNÉES DE DÉMONSTRATION ----------------------
+def default_table(name: str) -> pd.DataFrame:
+    if name == "products":
+        rows = [
+            {"SKU": "BAG-TRAD", "Produit": "Baguette traditionnelle", "Catégorie": "Boulangerie", "Prix vente TTC": 1.20, "TVA %": 5.5, "Allergènes": "Gluten", "Stock": 120, "Seuil alerte": 30},
+            {"SKU": "CRO-BA", "Produit": "Croissant beurre", "Catégorie": "Viennoiserie", "Prix vente TTC": 1.10, "TVA %": 5.5, "Allergènes": "Gluten;Lait;Œufs", "Stock": 80, "Seuil alerte": 20},
+        ]
+    elif name == "suppliers":
+        rows = [
+            {"Fournisseur": "Moulins Dupont", "Contact": "dupont@moulins.fr", "Téléphone": "+33 1 23 45 67 89", "Délai (j)": 2},
+            {"Fournisseur": "Beurres de Normandie", "Contact": "ventes@beurres.fr", "Téléphone": "+33 2 12 34 56 78", "Délai (j)": 3},
+            {"Fournisseur": "Grossiste Paris", "Contact": "contact@grossiste.paris", "Téléphone": "+33 1 98 76 54 32", "Délai (j)": 1},
+        ]
+    elif name == "supplier_prices":
+        rows = [
+            {"SKU": "BAG-TRAD", "Fournisseur": "Moulins Dupont", "Unité": "pièce", "Prix HT": 0.35, "Qté / unité": 1.0, "MOQ": 50},
+            {"SKU": "BAG-TRAD", "Fournisseur": "Grossiste Paris", "Unité": "pièce", "Prix HT": 0.33, "Qté / unité": 1.0, "MOQ": 80},
+            {"SKU": "CRO-BA", "Fournisseur": "Beurres de Normandie", "Unité": "pièce", "Prix HT": 0.42, "Qté / unité": 1.0, "MOQ": 40},
+            {"SKU": "CRO-BA", "Fournisseur": "Grossiste Paris", "Unité": "pièce", "Prix HT": 0.45, "Qté / unité": 1.0, "MOQ": 60},
+        ]
+    elif name == "ingredients":
+        rows = [
+            {"Code ingrédient": "FARINE-T45", "Nom": "Farine T45", "Unité achat": "kg", "Stock": 50.0},
+            {"Code ingrédient": "BEURRE-AOC", "Nom": "Beurre AOP", "Unité achat": "kg", "Stock": 5.0},
+            {"Code ingrédient": "LEVURE-B", "Nom": "Levure boulangère", "Unité achat": "kg", "Stock": 1.0},
+        ]
+    elif name == "ingredient_prices":
+        rows = [
+            {"Code ingrédient": "FARINE-T45", "Fournisseur": "Moulins Dupont", "Prix HT / unité": 0.80, "Qté / unité": 1.0},
+            {"Code ingrédient": "FARINE-T45", "Fournisseur": "Grossiste Paris", "Prix HT / unité": 0.78, "Qté / unité": 1.0},
+            {"Code ingrédient": "BEURRE-AOC", "Fournisseur": "Beurres de Normandie", "Prix HT / unité": 7.20, "Qté / unité": 1.0},
+            {"Code ingrédient": "LEVURE-B", "Fournisseur": "Grossiste Paris", "Prix HT / unité": 3.50, "Qté / unité": 1.0},
+        ]
+    elif name == "recipes":
+        rows = [
+            {"SKU": "BAG-TRAD", "Ingrédient": "FARINE-T45", "Qté par unité": 0.20, "Unité": "kg"},
+            {"SKU": "BAG-TRAD", "Ingrédient": "LEVURE-B", "Qté par unité": 0.005, "Unité": "kg"},
+            {"SKU": "CRO-BA", "Ingrédient": "FARINE-T45", "Qté par unité": 0.08, "Unité": "kg"},
+            {"SKU": "CRO-BA", "Ingrédient": "BEURRE-AOC", "Qté par unité": 0.035, "Unité": "kg"},
+        ]
+    elif name == "ingredient_allergens":
+        rows = [
+            {"Code ingrédient": "FARINE-T45", "Allergène": "Gluten"},
+            {"Code ingrédient": "BEURRE-AOC", "Allergène": "Lait"},
+        ]
+    elif name == "production_plan":
+        rows = [
+            {"Date": (date.today() + timedelta(days=d)).isoformat(), "SKU": sku, "Quantité": qty}
+            for d in range(1, 4) for sku, qty in [("BAG-TRAD", 300), ("CRO-BA", 150)]
+        ]
+    elif name == "price_history":
+        # 24 mois de tarifs (un changement par trimestre) jusqu'aux prix courants : le beurre monte, la farine fluctue
+        series = [
+            ("FARINE-T45", "Moulins Dupont", [0.70, 0.72, 0.74, 0.79, 0.83, 0.81, 0.78, 0.79, 0.80]),
+            ("FARINE-T45", "Grossiste Paris", [0.72, 0.73, 0.75, 0.80, 0.82, 0.80, 0.77, 0.77, 0.78]),
+            ("BEURRE-AOC", "Beurres de Normandie", [5.40, 5.55, 5.90, 6.40, 6.85, 7.30, 7.05, 7.10, 7.20]),
+            ("LEVURE-B", "Grossiste Paris", [3.20, 3.20, 3.25, 3.30, 3.35, 3.40, 3.45, 3.50, 3.50]),
+        ]
+        start = pd.Timestamp(date.today()).to_period("M") - 24
+        rows = [
+            {"Type": "Ingrédient", "Code": code, "Fournisseur": supplier,
+             "Date d'effet": (start + 3 * i).to_timestamp().date().isoformat(), "Prix HT": price}
+            for code, supplier, prices in series for i, price in enumerate(prices)
+        ]
+    elif name == "overheads":
+        rows = [
+            {"Intitulé": "Loyer", "Montant mensuel €": 1500},
+            {"Intitulé": "Énergie", "Montant mensuel €": 600},
+            {"Intitulé": "Assurance", "Montant mensuel €": 120},
+            {"Intitulé": "Divers", "Montant mensuel €": 180},
+        ]
+    elif name == "employees":
+        rows = [
+            {"Employé": "Alice", "Rôle": "Boulangère", "Taux horaire €": 14.0, "Prime €/h": 0.0, "Charges %": 42.0, "Heures max / sem.": 35.0},
+            {"Employé": "Bruno", "Rôle": "Vente", "Taux horaire €": 12.0, "Prime €/h": 0.5, "Charges %": 38.0, "Heures max / sem.": 35.0},
+        ]
+    elif name == "shifts":
+        rows = [
+            {"Date": (date.today()).isoformat(), "Employé": "Alice", "Rôle": "Boulangère", "Début": "05:00", "Fin": "13:00"},
+            {"Date": (date.today() + timedelta(days=1)).isoformat(), "Employé": "Bruno", "Rôle": "Vente", "Début": "08:00", "Fin": "14:00"},
+        ]
+    elif name == "staffing":
+        # besoins en personnel du mardi au samedi (boutique fermée dimanche et lundi)
+        rows = [
+            {"Jour": day, "Rôle": role, "Début": start, "Fin": end, "Effectif": 1}
+            for day in ["Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+            for role, start, end in [("Boulangère", "05:00", "12:00"), ("Vente", "07:00", "13:00")]
+        ]
+    elif name == "availability":
+        # un employé sans ligne ici est disponible tous les jours
+        rows = [
+            {"Employé": "Bruno", "Jour": day, "Début": "06:00", "Fin": "20:00"}
+            for day in ["Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+        ]
+    else:
+        raise KeyError(name)
+    return pd.DataFrame(rows)
+
+# ---------------------- LECTURE CSV (cache) ----------------------
+def file_signature(path: str):
+    # (mtime, taille) : change dès que le fichier est réécrit, sans relire son contenu
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_csv_cached(path: str, mtime_ns: int, size: int, dtypes: dict) -> pd.DataFrame:
+    # mtime_ns / size ne servent qu'à la clé de cache : un fichier modifié invalide l'entrée
+    try:
+        return pd.read_csv(path, dtype=dtypes)
+    except (ValueError, TypeError):
+        # colonne non conforme au schéma : on retombe sur l'inférence pandas
+        return pd.read_csv(path)
+
+def load_csv_or_default(name, default_df, dtypes=None):
+    sig = file_signature(name)
+    if sig is None:
+        return default_df.copy()
+    try:
+        return _read_csv_cached(name, sig[0], sig[1], dtypes or {})
+    except Exception:
+        return default_df.copy()
+
+# ---------------------- STOCKAGE SQLITE (optionnel) ----------------------
+# Activé par la variable d'environnement BOULANGERIE_DB (chemin du fichier .db). Au premier
+# accès, chaque table est importée depuis son CSV (ou les données de démonstration).
+def get_store():
+    path = os.environ.get("BOULANGERIE_DB")
+    return _open_store(path) if path else None
+
+@st.cache_resource(show_spinner=False)
+def _open_store(path: str) -> SQLiteStore:
+    return SQLiteStore(path)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_table_cached(path: str, name: str, version: int, dtypes: dict) -> pd.DataFrame:
+    # `version` est incrémentée à chaque écriture dans la table : seule la table modifiée est relue
+    return _open_store(path).read_table(name, dtypes)
+
+def load_table(name: str) -> pd.DataFrame:
+    store = get_store()
+    if store is None:
+        return load_csv_or_default(f"{name}.csv", default_table(name), DTYPES.get(name))
+    if not store.has_table(name):
+        seed = load_csv_or_default(f"{name}.csv", default_table(name), DTYPES.get(name))
+        store.write_table(name, seed, DTYPES.get(name))
+    return _read_table_cached(store.path, name, store.version(name), DTYPES.get(name) or {})
+
+def source_version(name: str) -> tuple:
+    # Version bon marché du contenu d'une table tel que load_table le lit (clé des caches partagés) :
+    # compteur SQLite, (mtime, taille) du CSV, ou données de démonstration du jour. Aucune lecture des données.
+    store = get_store()
+    if store is not None:
+        return "sqlite", store.path, name, store.version(name)
+    path = f"{name}.csv"
+    sig = file_signature(path)
+    if sig is not None:
+        return "csv", os.path.abspath(path), *sig
+    return "démo", name, date.today().isoformat()
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    # empreinte du contenu complet (colonnes + valeurs, dans l'ordre), pour les caches bâtis sur des tables éditées
+    h = hashlib.blake2b(repr(tuple(df.columns)).encode("utf-8"), digest_size=16)
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+# ---------------------- ÉDITION / EXPORT ----------------------
+def apply_editor_diff(full: pd.DataFrame, shown: pd.DataFrame, state: dict) -> pd.DataFrame:
+    # applique le diff de st.data_editor (positions de lignes dans `shown`, qui peut n'être qu'un
+    # extrait de `full` avec le même index) à la table complète
+    ids = shown.index
+    out = full.copy()
+    for pos, values in state.get("edited_rows", {}).items():
+        for col, value in values.items():
+            if col in out.columns:
+                out.at[ids[int(pos)], col] = value
+    out = out.drop(index=[ids[int(pos)] for pos in state.get("deleted_rows", [])])
+    added = state.get("added_rows", [])
+    if added:
+        new_rows = pd.DataFrame(added).reindex(columns=out.columns)
+        start = int(out.index.max()) + 1 if len(out) and pd.api.types.is_integer_dtype(out.index) else 0
+        new_rows.index = pd.RangeIndex(start, start + len(new_rows), name=out.index.name)
+        out = pd.concat([out, new_rows])
+    return out
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def csv_bytes(version: tuple, _df: pd.DataFrame) -> bytes:
+    # `version` (voir table_version dans app.py) sert de clé : le contenu n'est pas haché à chaque rerun
+    return _df.to_csv(index=False).encode("utf-8")
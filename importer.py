@@ -0,0 +1,209 @@
+import re
+import unicodedata
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from datastore import DTYPES
+
+# ---------------------- TABLES IMPORTABLES ----------------------
+# clé naturelle (une ligne par clé après import) et colonnes obligatoires de chaque table
+IMPORT_TABLES = {
+    "supplier_prices": {"keys": ["SKU", "Fournisseur"], "required": ["SKU", "Fournisseur", "Prix HT"]},
+    "ingredient_prices": {"keys": ["Code ingrédient", "Fournisseur"],
+                          "required": ["Code ingrédient", "Fournisseur", "Prix HT / unité"]},
+    "shifts": {"keys": ["Date", "Employé", "Début"], "required": ["Date", "Employé", "Début", "Fin"]},
+}
+
+# intitulés rencontrés dans les tarifs des grossistes et les exports de planning (sans accents, en minuscules)
+ALIASES = {
+    "SKU": ["sku", "code article", "code produit", "reference", "ref", "ref article", "ean"],
+    "Code ingrédient": ["code ingredient", "code article", "reference", "ref", "ref article", "code"],
+    "Fournisseur": ["fournisseur", "supplier", "grossiste"],
+    "Unité": ["unite", "unite de vente", "uv"],
+    "Prix HT": ["prix ht", "pu ht", "prix unitaire ht", "tarif ht", "prix net ht", "prix", "tarif"],
+    "Prix HT / unité": ["prix ht / unite", "prix ht", "pu ht", "prix unitaire ht", "tarif ht", "prix net ht", "prix", "tarif"],
+    "Qté / unité": ["qte / unite", "conditionnement", "colisage", "pcb", "qte par colis", "contenance"],
+    "MOQ": ["moq", "minimum de commande", "qte min", "quantite minimum", "minimum"],
+    "Date": ["date", "jour"],
+    "Employé": ["employe", "salarie", "nom", "collaborateur"],
+    "Rôle": ["role", "poste", "fonction"],
+    "Début": ["debut", "heure debut", "heure de debut", "start"],
+    "Fin": ["fin", "heure fin", "heure de fin", "end"],
+}
+
+def _norm(text) -> str:
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().replace("_", " ").split())
+
+def suggest_mapping(columns, table: str) -> dict:
+    # colonne cible → colonne du fichier (ou None), d'après les intitulés connus
+    by_norm = {}
+    for col in columns:
+        by_norm.setdefault(_norm(col), col)
+    mapping = {}
+    for target in DTYPES[table]:
+        candidates = [_norm(target)] + ALIASES.get(target, [])
+        mapping[target] = next((by_norm[c] for c in candidates if c in by_norm), None)
+    return mapping
+
+# ---------------------- VALIDATION D'UN MORCEAU ----------------------
+def _map_unique(values: pd.Series, fn) -> pd.Series:
+    # applique fn (Series → Series) aux seules valeurs distinctes : les fichiers répètent les mêmes
+    # dates, heures, employés, fournisseurs… ; les cases vides restent NaN
+    codes, uniques = pd.factorize(values)
+    mapped = np.append(fn(pd.Series(uniques, dtype=object)).to_numpy(dtype=object), np.nan)
+    return pd.Series(mapped.take(codes), index=values.index)  # code -1 → dernier élément (NaN)
+
+def _strip(values: pd.Series) -> pd.Series:
+    # espaces retirés ; case vide → NaN
+    text = values.str.strip()
+    return text.mask(text == "")
+
+def _format_dates(values: pd.Series, formats: list, out_fmt: str) -> pd.Series:
+    # texte → date / heure lue avec le premier format qui convient → texte normalisé (NaN si illisible)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in formats:
+        todo = parsed.isna()
+        parsed[todo] = pd.to_datetime(values[todo], format=fmt, errors="coerce")
+    return parsed.dt.strftime(out_fmt)
+
+def _to_number(values: pd.Series) -> pd.Series:
+    # "1 234,50" / "1234.5" → 1234.5 ; vide ou illisible → NaN
+    text = values.str.replace(r"[\s €]", "", regex=True).str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce")
+
+def clean_chunk(raw: pd.DataFrame, table: str, mapping: dict, constants: dict = None, lines=None):
+    # Morceau brut (tout en texte) → (lignes valides au schéma de `table`, lignes rejetées avec leur motif).
+    # "Ligne" = numéro de ligne dans le fichier (en-tête = ligne 1), `lines` s'il est fourni.
+    spec = IMPORT_TABLES[table]
+    dtypes = DTYPES[table]
+    out = pd.DataFrame(index=raw.index)
+    for target, source in mapping.items():
+        if source is not None:
+            out[target] = _map_unique(raw[source], _strip)
+    for target, value in (constants or {}).items():
+        out[target] = value
+    reasons = pd.Series("", index=raw.index, dtype=object)
+
+    def reject(mask, reason):
+        nonlocal reasons
+        if mask.any():
+            reasons = reasons.where(~mask, reasons + reason + " ; ")
+
+    # octets invalides dans l'encodage choisi (lus comme U+FFFD) : ligne rejetée plutôt qu'importée abîmée
+    for source in dict.fromkeys(s for s in mapping.values() if s is not None):
+        reject(raw[source].str.contains("\ufffd", regex=False, na=False), f"{source} : caractères illisibles (encodage ?)")
+    for col in spec["required"]:
+        if col not in out.columns:
+            out[col] = np.nan
+        reject(out[col].isna(), f"{col} manquant")
+    for col in out.columns:
+        if dtypes.get(col) in ("float64", "Int64"):
+            number = _to_number(out[col])
+            reject(out[col].notna() & number.isna(), f"{col} non numérique")
+            reject(number < 0, f"{col} négatif")
+            if dtypes[col] == "Int64":
+                number = number.round()
+            out[col] = number
+    if "Date" in out.columns:
+        day = _map_unique(out["Date"], lambda u: _format_dates(u, ["%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"], "%Y-%m-%d"))
+        reject(out["Date"].notna() & day.isna(), "Date invalide")
+        out["Date"] = day
+    for col in ["Début", "Fin"]:
+        if col in out.columns:
+            # "5h30" / "5:30" / "05:30:00" → "05:30"
+            hour = _map_unique(out[col], lambda u: _format_dates(
+                u.str.replace("h", ":", regex=False).str.replace(r":$", ":00", regex=True), ["%H:%M", "%H:%M:%S"], "%H:%M"))
+            reject(out[col].notna() & hour.isna(), f"{col} invalide (HH:MM)")
+            out[col] = hour
+
+    bad = reasons != ""
+    lines = raw.index + 2 if lines is None else np.asarray(lines)
+    rejected = raw[bad].assign(Ligne=lines[bad.to_numpy()], Motif=reasons[bad].str.rstrip(" ;"))
+    good = out[~bad]
+    good = good.astype({c: t for c, t in dtypes.items() if c in good.columns and t != "str"})
+    return good[[c for c in dtypes if c in good.columns]], rejected
+
+# ---------------------- UPSERT ----------------------
+def upsert_frame(full: pd.DataFrame, rows: pd.DataFrame, keys: list) -> pd.DataFrame:
+    # Lignes dont la clé existe : colonnes fournies mises à jour (les autres sont conservées) ;
+    # clés nouvelles : ajoutées en fin de table. `rows` ne doit pas contenir de clé en double.
+    if rows.empty:
+        return full
+    full_keys = pd.MultiIndex.from_frame(full[keys].astype(str))
+    new_keys = pd.MultiIndex.from_frame(rows[keys].astype(str))
+    hit = full_keys.isin(new_keys)
+    out = full.copy()
+    if hit.any():
+        values = rows.set_axis(new_keys).reindex(full_keys[hit])
+        for col in rows.columns.difference(keys):
+            out.loc[hit, col] = values[col].to_numpy()
+    added = rows[~new_keys.isin(full_keys)]
+    if len(added):
+        start = int(out.index.max()) + 1 if len(out) and pd.api.types.is_integer_dtype(out.index) else 0
+        added = added.reindex(columns=out.columns).set_axis(pd.RangeIndex(start, start + len(added), name=out.index.name))
+        out = pd.concat([out, added])
+    return out
+
+# ---------------------- IMPORT PAR MORCEAUX ----------------------
+def read_header(file, sep: str, encoding: str) -> pd.DataFrame:
+    # aperçu (5 lignes) pour le choix des colonnes ; le fichier est rembobiné
+    preview = pd.read_csv(file, sep=sep, encoding=encoding, dtype=str, nrows=5, on_bad_lines="skip")
+    file.seek(0)
+    return preview
+
+def import_csv(file, table: str, mapping: dict, upsert, constants: dict = None, sep: str = ";",
+               encoding: str = "utf-8", chunksize: int = 50_000, progress=None):
+    # Lit `file` par morceaux de `chunksize` lignes (tout en texte), valide, dédoublonne sur la clé
+    # naturelle et passe chaque morceau à upsert(lignes, clés). Renvoie (statistiques, lignes rejetées) ;
+    # progress(fraction, texte) suit l'avancement. "importées" compte les clés distinctes du fichier,
+    # "doublons" les lignes dont la clé est déjà apparue plus haut, dans ce morceau ou un précédent.
+    # Les octets invalides dans `encoding` ne lèvent pas d'erreur en cours d'import : les lignes touchées
+    # sont rejetées (voir clean_chunk).
+    keys = IMPORT_TABLES[table]["keys"]
+    seen = pd.Index([], dtype=object)  # clés déjà importées ("a\x1fb\x1fc")
+    size = getattr(file, "size", None)
+    stats = {"lues": 0, "importées": 0, "doublons": 0, "rejetées": 0}
+    rejected = []
+    skipped = []  # numéros des lignes mal formées, pour retrouver le numéro de ligne des autres
+    reader = pd.read_csv(file, sep=sep, encoding=encoding, encoding_errors="replace", dtype=str,
+                         chunksize=chunksize, keep_default_na=False, on_bad_lines="warn")
+    with reader:
+        while True:
+            # lignes avec trop de champs : signalées par pandas (ParserWarning), versées au rapport
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                raw = next(reader, None)
+            malformed = [(int(line), reason) for w in caught
+                         for line, reason in re.findall(r"Skipping line (\d+): ([^\n]*)", str(w.message))]
+            skipped += [line for line, _ in malformed]
+            if malformed:
+                stats["lues"] += len(malformed)
+                stats["rejetées"] += len(malformed)
+                rejected.append(pd.DataFrame(malformed, columns=["Ligne", "Motif"]))
+            if raw is None:
+                break
+            # ligne du fichier = position + en-tête + lignes mal formées qui la précèdent
+            before = np.asarray(skipped) - 2 - np.arange(len(skipped))
+            lines = raw.index + 2 + np.searchsorted(before, raw.index, side="right")
+            good, bad = clean_chunk(raw, table, mapping, constants, lines)
+            deduped = good.drop_duplicates(keys, keep="last")
+            upsert(deduped, keys)
+            chunk_keys = deduped[keys[0]].astype(str).str.cat([deduped[k].astype(str) for k in keys[1:]], sep="\x1f")
+            fresh = ~chunk_keys.isin(seen)
+            seen = seen.append(pd.Index(chunk_keys[fresh]))
+            stats["lues"] += len(raw)
+            stats["importées"] += int(fresh.sum())
+            stats["doublons"] += len(good) - int(fresh.sum())
+            stats["rejetées"] += len(bad)
+            if len(bad):
+                rejected.append(bad)
+            if progress is not None:
+                done = min(1.0, file.tell() / size) if size else 0.0
+                progress(done, f"{stats['lues']:,} lignes lues".replace(",", " "))
+    if not rejected:
+        return stats, pd.DataFrame(columns=["Ligne", "Motif"])
+    rejected = pd.concat(rejected, ignore_index=True).sort_values("Ligne", kind="mergesort")
+    return stats, rejected[["Ligne", "Motif"] + [c for c in rejected.columns if c not in ("Ligne", "Motif")]]
@@ -0,0 +1,113 @@
+import html
+import io
+import zipfile
+
+import pandas as pd
+
+from allergens import INCO_ALLERGENS, allergen_matrix, matrix_to_text, other_allergens
+
+# ---------------------- ALLERGÈNES DÉDUITS DES RECETTES ----------------------
+def ingredient_allergen_matrix(ingredient_allergens: pd.DataFrame) -> pd.DataFrame:
+    # table longue (Code ingrédient, Allergène) → matrice booléenne code × allergène INCO
+    ia = ingredient_allergens.dropna(subset=["Code ingrédient", "Allergène"])
+    matrix = pd.crosstab(ia["Code ingrédient"], ia["Allergène"]) > 0
+    return matrix.reindex(columns=INCO_ALLERGENS, fill_value=False)
+
+def bom_allergen_matrix(recipes: pd.DataFrame, ingredient_allergens: pd.DataFrame) -> pd.DataFrame:
+    # Allergènes de chaque SKU = union de ceux de ses ingrédients. Les sous-recettes (pâtes, crèmes…)
+    # sont propagées jusqu'au point fixe : une itération par niveau d'imbrication, cycles compris.
+    base = ingredient_allergen_matrix(ingredient_allergens)
+    lines = recipes.dropna(subset=["SKU", "Ingrédient"])
+    skus = lines["SKU"].to_numpy()
+    node = base
+    for _ in range(lines["SKU"].nunique() + 1):
+        flags = node.reindex(lines["Ingrédient"], fill_value=False).to_numpy(dtype=bool)
+        per_sku = pd.DataFrame(flags, index=skus, columns=INCO_ALLERGENS).groupby(level=0).any()
+        idx = base.index.union(per_sku.index)
+        new_node = base.reindex(idx, fill_value=False) | per_sku.reindex(idx, fill_value=False)
+        if new_node.equals(node):
+            break
+        node = new_node
+    return node.reindex(pd.Index(lines["SKU"].unique(), name="SKU"), fill_value=False)
+
+# ---------------------- TABLE DES ÉTIQUETTES ----------------------
+def label_table(products: pd.DataFrame, recipes: pd.DataFrame, ingredients: pd.DataFrame,
+                ingredient_allergens: pd.DataFrame, plan: pd.DataFrame = None) -> pd.DataFrame:
+    # Une ligne par étiquette : allergènes = recette ∪ déclarés sur le produit (on n'en perd jamais),
+    # liste d'ingrédients par quantité décroissante. `plan` (SKU, Quantité) restreint aux SKU produits.
+    prods = products[["SKU", "Produit"]].drop_duplicates("SKU")
+    if plan is not None:
+        qty = plan.groupby("SKU")["Quantité"].sum() if "Quantité" in plan.columns else plan["SKU"].value_counts()
+        prods = prods[prods["SKU"].isin(qty.index)].assign(Quantité=lambda d: d["SKU"].map(qty).to_numpy())
+    prods = prods.reset_index(drop=True)
+
+    declared_text = (products.drop_duplicates("SKU").set_index("SKU")["Allergènes"]
+                     if "Allergènes" in products.columns else pd.Series(dtype=object))
+    declared = allergen_matrix(declared_text)
+    from_bom = bom_allergen_matrix(recipes, ingredient_allergens)
+    union = (declared.reindex(prods["SKU"], fill_value=False).to_numpy()
+             | from_bom.reindex(prods["SKU"], fill_value=False).to_numpy())
+    # libellés déclarés hors liste INCO : imprimés après les allergènes réglementaires
+    others = other_allergens(declared_text).reindex(prods["SKU"]).fillna("").reset_index(drop=True)
+    allergens = matrix_to_text(pd.DataFrame(union, columns=INCO_ALLERGENS), others)
+
+    # nom affiché : catalogue ingrédients, sinon nom du produit (sous-recette), sinon le code
+    names = pd.concat([ingredients.set_index("Code ingrédient")["Nom"], products.set_index("SKU")["Produit"]])
+    names = names[~names.index.duplicated()]
+    lines = recipes[recipes["SKU"].isin(prods["SKU"])]
+    lines = lines.assign(Nom=lines["Ingrédient"].map(names).fillna(lines["Ingrédient"]).astype(str),
+                         Qté=pd.to_numeric(lines["Qté par unité"], errors="coerce"))
+    lines = lines.sort_values(["SKU", "Qté"], ascending=[True, False], kind="mergesort")
+    ingredient_list = lines.groupby("SKU", sort=False)["Nom"].agg(", ".join)
+
+    out = prods.assign(**{
+        "Ingrédients": prods["SKU"].map(ingredient_list).fillna("").to_numpy(),
+        "Allergènes": allergens.to_numpy(),
+    })
+    return pd.concat([out, pd.DataFrame(union, columns=INCO_ALLERGENS)], axis=1)
+
+# ---------------------- SORTIES ----------------------
+LABEL_CSS = """
+@page { size: A4; margin: 8mm; }
+body { font-family: Arial, sans-serif; margin: 0; }
+.sheet { display: flex; flex-wrap: wrap; gap: 4mm; }
+.label { width: 62mm; height: 42mm; border: 1px solid #333; padding: 2mm; box-sizing: border-box;
+         break-inside: avoid; page-break-inside: avoid; font-size: 8pt; overflow: hidden; }
+.label h2 { font-size: 10pt; margin: 0 0 1mm 0; }
+.sku { color: #555; }
+.allergens { font-weight: bold; }
+"""
+
+def iter_labels_html(labels: pd.DataFrame, title: str = "Étiquettes INCO"):
+    # HTML imprimable (ou « Imprimer en PDF » depuis le navigateur), produit morceau par morceau
+    yield f"<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+    yield f"<style>{LABEL_CSS}</style></head><body><div class='sheet'>"
+    quantities = labels["Quantité"] if "Quantité" in labels.columns else [None] * len(labels)
+    for sku, name, ingr, allergens, qty in zip(labels["SKU"], labels["Produit"], labels["Ingrédients"],
+                                               labels["Allergènes"], quantities):
+        qty = "" if qty is None else f" — {html.escape(str(qty))} u."
+        yield (
+            "<div class='label'>"
+            f"<h2>{html.escape(str(name))}</h2>"
+            f"<div class='sku'>{html.escape(str(sku))}{qty}</div>"
+            f"<div>Ingrédients : {html.escape(str(ingr))}</div>"
+            f"<div class='allergens'>Allergènes : {html.escape(str(allergens)) or 'aucun'}</div>"
+            "</div>"
+        )
+    yield "</div></body></html>"
+
+def labels_html(labels: pd.DataFrame) -> bytes:
+    buf = io.StringIO()
+    for chunk in iter_labels_html(labels):
+        buf.write(chunk)
+    return buf.getvalue().encode("utf-8")
+
+def labels_zip(labels: pd.DataFrame) -> bytes:
+    # étiquettes + fiche allergènes (une colonne Oui/vide par allergène), en CSV dans une archive
+    buf = io.BytesIO()
+    base_cols = [c for c in ["SKU", "Produit", "Quantité", "Ingrédients", "Allergènes"] if c in labels.columns]
+    sheet = labels[["SKU", "Produit"]].join(labels[INCO_ALLERGENS].replace({True: "Oui", False: ""}))
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("etiquettes.csv", labels[base_cols].to_csv(index=False))
+        zf.writestr("fiche_allergenes.csv", sheet.to_csv(index=False))
+    return buf.getvalue()
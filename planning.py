@@ -0,0 +1,48 @@
+from datetime import date
+
+import pandas as pd
+
+RATE_COLUMNS = ["Taux horaire €", "Prime €/h", "Charges %"]
+
+# ---------------------- HEURES ----------------------
+def _to_datetime_unique(values: pd.Series, fmt=None) -> pd.Series:
+    # un planning répète les mêmes dates et heures : on ne parse que les valeurs distinctes
+    codes, uniques = pd.factorize(values.astype(str))
+    parsed = pd.to_datetime(pd.Series(uniques), format=fmt, errors="coerce").to_numpy()
+    out = parsed.take(codes) if len(uniques) else parsed[:0].repeat(len(codes))
+    return pd.Series(out, index=values.index)
+
+def shift_hours(start: pd.Series, end: pd.Series) -> pd.Series:
+    # durée en heures de chaque shift "HH:MM" → "HH:MM" ; un shift qui passe minuit compte +24 h, une heure illisible compte 0
+    t1 = _to_datetime_unique(start, "%H:%M")
+    t2 = _to_datetime_unique(end, "%H:%M")
+    hrs = (t2 - t1).dt.total_seconds() / 3600
+    return hrs.where(hrs >= 0, hrs + 24).fillna(0.0)
+
+# ---------------------- COÛTS ----------------------
+def shift_costs(shifts: pd.DataFrame, employees: pd.DataFrame, start: date = None, end: date = None) -> pd.DataFrame:
+    # Shifts entre start et end (inclus) avec "Heures" et "Coût chargé €" : dates et heures parsées une seule
+    # fois pour toute la colonne, taux employés joints en une seule fusion.
+    days = _to_datetime_unique(shifts["Date"]).dt.normalize()
+    mask = days.notna()
+    if start is not None:
+        mask &= days >= pd.Timestamp(start)
+    if end is not None:
+        mask &= days <= pd.Timestamp(end)
+    out = shifts[mask]  # index d'origine conservé (ids SQLite pour l'éditeur)
+
+    rates = employees.drop_duplicates("Employé", keep="last").set_index("Employé")
+    rates = rates.reindex(columns=RATE_COLUMNS).apply(pd.to_numeric, errors="coerce")
+    joined = rates.reindex(out["Employé"]).fillna(0.0).set_axis(out.index)
+
+    hrs = shift_hours(out["Début"], out["Fin"])
+    cost = hrs * (joined["Taux horaire €"] + joined["Prime €/h"]) * (1 + joined["Charges %"] / 100.0)
+    return out.assign(**{"Heures": hrs.round(2), "Coût chargé €": cost.round(2)})
+
+def weekly_totals(costed: pd.DataFrame, by: str = "Employé") -> pd.DataFrame:
+    # heures et coût chargé par semaine (lundi) et par employé ou par rôle
+    week = _to_datetime_unique(costed["Date"])
+    week = week.dt.normalize() - pd.to_timedelta(week.dt.weekday, unit="D")
+    grouped = costed.groupby([week.rename("Semaine"), costed[by]])[["Heures", "Coût chargé €"]].sum().reset_index()
+    grouped["Semaine"] = grouped["Semaine"].dt.date
+    return grouped
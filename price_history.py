@@ -0,0 +1,147 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from costing import RECIPE_SUPPLIER, compute_margin
+from datastore import frame_fingerprint
+from production import flatten_bom
+
+# table de prix courants → (Type dans l'historique, colonne clé, colonne prix)
+PRICE_TABLES = {
+    "ingredient_prices": ("Ingrédient", "Code ingrédient", "Prix HT / unité"),
+    "supplier_prices": ("Produit", "SKU", "Prix HT"),
+}
+HISTORY_KEYS = ["Type", "Code", "Fournisseur"]
+# PriceHistory est partagé entre sessions (st.cache_resource) : chaque recette éditée et chaque
+# nouveau jour (month_ends finit à aujourd'hui) ajouteraient sinon une entrée au mémo des coûts matières
+MATERIAL_MEMO_SIZE = 4
+
+def _offers(prices: pd.DataFrame, table: str) -> pd.DataFrame:
+    # prix courants au format de l'historique (Code, Fournisseur, Prix HT), hors lignes "Recette calculée"
+    _, key, price_col = PRICE_TABLES[table]
+    df = prices[prices["Fournisseur"] != RECIPE_SUPPLIER].dropna(subset=[key, "Fournisseur"])
+    out = pd.DataFrame({
+        "Code": df[key].astype(str).to_numpy(),
+        "Fournisseur": df["Fournisseur"].astype(str).to_numpy(),
+        "Prix HT": pd.to_numeric(df[price_col], errors="coerce").to_numpy(),
+    })
+    return out.dropna(subset=["Prix HT"]).drop_duplicates(["Code", "Fournisseur"], keep="last")
+
+# ---------------------- ENREGISTREMENT DES CHANGEMENTS ----------------------
+def price_changes(table: str, old: pd.DataFrame, new: pd.DataFrame, history: pd.DataFrame,
+                  effective: date = None) -> pd.DataFrame:
+    # Lignes d'historique pour les prix nouveaux ou modifiés entre `old` et `new`, en vigueur à `effective`.
+    # Une offre sans historique reçoit aussi son ancien prix, daté de la veille, pour que le passé le garde.
+    kind = PRICE_TABLES[table][0]
+    effective = effective or date.today()
+    merged = _offers(new, table).merge(_offers(old, table), on=["Code", "Fournisseur"], how="left",
+                                       suffixes=("", " avant"))
+    changed = merged[merged["Prix HT avant"].isna() | ((merged["Prix HT"] - merged["Prix HT avant"]).abs() > 1e-9)]
+    if changed.empty:
+        return pd.DataFrame(columns=["Type", "Code", "Fournisseur", "Date d'effet", "Prix HT"])
+    known = pd.MultiIndex.from_frame(history.loc[history["Type"] == kind, ["Code", "Fournisseur"]].astype(str))
+    seed = changed[changed["Prix HT avant"].notna()
+                   & ~pd.MultiIndex.from_frame(changed[["Code", "Fournisseur"]]).isin(known)]
+    rows = pd.concat([
+        seed.assign(**{"Date d'effet": (effective - timedelta(days=1)).isoformat(), "Prix HT": seed["Prix HT avant"]}),
+        changed.assign(**{"Date d'effet": effective.isoformat()}),
+    ], ignore_index=True)
+    return rows.assign(Type=kind)[["Type", "Code", "Fournisseur", "Date d'effet", "Prix HT"]]
+
+# ---------------------- HISTORIQUE INDEXÉ ----------------------
+class PriceHistory:
+    # Historique trié par (Type, Code, Fournisseur, date) ; les dates ne sont parsées qu'une fois.
+    # Prix d'une offre à la date D = dernier prix en vigueur à D (merge_asof). Avant son premier prix
+    # connu, une offre garde ce premier prix ; une offre sans historique garde son prix courant.
+    def __init__(self, history: pd.DataFrame, ingredient_prices: pd.DataFrame, supplier_prices: pd.DataFrame):
+        h = pd.DataFrame({
+            "Type": history["Type"].astype(str),
+            "Code": history["Code"].astype(str),
+            "Fournisseur": history["Fournisseur"].astype(str),
+            "Date": pd.to_datetime(history["Date d'effet"], errors="coerce"),
+            "Prix HT": pd.to_numeric(history["Prix HT"], errors="coerce"),
+        }).dropna(subset=["Date", "Prix HT"])
+        self.df = h.sort_values(HISTORY_KEYS + ["Date"], kind="mergesort").reset_index(drop=True)
+        self.current = {PRICE_TABLES[t][0]: _offers(df, t) for t, df in
+                        [("ingredient_prices", ingredient_prices), ("supplier_prices", supplier_prices)]}
+        self._material = {}  # (recettes, dates) → coûts ; borné à MATERIAL_MEMO_SIZE entrées (objet partagé)
+        self._material_lock = threading.Lock()
+
+    def best_prices(self, kind: str, dates) -> pd.DataFrame:
+        # meilleur prix de chaque code à chaque date (index : dates, colonnes : codes), pour tous les codes à la fois
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+        h = self.df[self.df["Type"] == kind]
+        pairs = h[["Code", "Fournisseur"]].drop_duplicates()
+        grid = pairs.merge(pd.DataFrame({"Date": dates}), how="cross").sort_values("Date", kind="mergesort")
+        asof = pd.merge_asof(grid, h.sort_values("Date", kind="mergesort"), on="Date",
+                             by=["Code", "Fournisseur"], direction="backward")
+        first = h.drop_duplicates(["Code", "Fournisseur"]).set_index(["Code", "Fournisseur"])["Prix HT"]
+        before_first = asof["Prix HT"].isna()
+        asof.loc[before_first, "Prix HT"] = first.reindex(
+            pd.MultiIndex.from_frame(asof.loc[before_first, ["Code", "Fournisseur"]])).to_numpy()
+
+        cur = self.current[kind]
+        without_history = cur[~pd.MultiIndex.from_frame(cur[["Code", "Fournisseur"]]).isin(
+            pd.MultiIndex.from_frame(pairs))]
+        flat = without_history.merge(pd.DataFrame({"Date": dates}), how="cross")
+        all_prices = pd.concat([asof[["Date", "Code", "Prix HT"]], flat[["Date", "Code", "Prix HT"]]], ignore_index=True)
+        best = all_prices.groupby(["Date", "Code"])["Prix HT"].min().unstack("Code")
+        return best.reindex(dates)
+
+    def best_prices_asof(self, kind: str, when) -> pd.Series:
+        # "meilleur prix au jour D" de tous les codes (index : code), au format de best_ingredient_prices
+        return self.best_prices(kind, [when]).iloc[0].dropna()
+
+    def material_costs(self, recipes: pd.DataFrame, dates, version=None) -> pd.DataFrame:
+        # Coût matières HT de chaque SKU à recette, à chaque date (index : dates, colonnes : SKU).
+        # Nomenclature à plat × prix de toutes les dates en un seul calcul, au lieu d'un
+        # batch_recipe_costs(recipes, best_prices_asof(D)) par date. `version` : version des recettes
+        # (clé du mémo) ; à défaut, empreinte du contenu.
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+        memo_key = (version if version is not None else frame_fingerprint(recipes), tuple(dates))
+        costs = self._material.get(memo_key)
+        if costs is None:
+            flat = flatten_bom(recipes)
+            prices = self.best_prices("Ingrédient", dates)
+            per_line = prices.reindex(columns=flat["Ingrédient"]).fillna(0.0).to_numpy() * flat["Qté"].to_numpy()
+            per_sku = pd.DataFrame(per_line.T, index=flat["SKU"].to_numpy()).groupby(level=0, sort=False).sum()
+            costs = pd.DataFrame(per_sku.T.to_numpy(), index=dates, columns=per_sku.index)
+            with self._material_lock:
+                while len(self._material) >= MATERIAL_MEMO_SIZE:
+                    self._material.pop(next(iter(self._material)))  # plus ancienne entrée
+                self._material[memo_key] = costs
+        return costs
+
+    def purchase_costs(self, recipes: pd.DataFrame, dates, version=None) -> pd.DataFrame:
+        # coût d'achat HT par SKU et par date : coût de la recette s'il y en a une, sinon meilleur tarif fournisseur
+        material = self.material_costs(recipes, dates, version)
+        bought = self.best_prices("Produit", dates)
+        skus = material.columns.union(bought.columns)
+        m = material.reindex(columns=skus).to_numpy()
+        return pd.DataFrame(np.where(np.isnan(m), bought.reindex(index=material.index, columns=skus).to_numpy(), m),
+                            index=material.index, columns=skus)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_price_history(versions: tuple, _history: pd.DataFrame, _ingredient_prices: pd.DataFrame,
+                      _supplier_prices: pd.DataFrame) -> PriceHistory:
+    # reconstruit uniquement quand la version de l'historique ou des prix courants change
+    return PriceHistory(_history, _ingredient_prices, _supplier_prices)
+
+# ---------------------- ÉVOLUTION DES MARGES ----------------------
+def month_ends(months: int = 24, today: date = None) -> pd.DatetimeIndex:
+    # fin de chacun des `months` derniers mois, puis aujourd'hui
+    today = pd.Timestamp(today or date.today()).normalize()
+    periods = pd.period_range(end=today.to_period("M"), periods=months + 1, freq="M")
+    return periods.to_timestamp(how="end").normalize()[:-1].append(pd.DatetimeIndex([today]))
+
+def margin_history(products: pd.DataFrame, purchase: pd.DataFrame, labor_unit, overhead_unit) -> dict:
+    # compute_margin sur la matrice dates × SKU en une fois ; prix de vente et TVA courants du catalogue
+    prods = products.drop_duplicates("SKU").set_index("SKU").reindex(purchase.columns)
+    tva = pd.to_numeric(prods["TVA %"], errors="coerce").fillna(0.0).to_numpy()
+    selling = pd.to_numeric(prods["Prix vente TTC"], errors="coerce").fillna(0.0).to_numpy()
+    res = compute_margin(purchase.to_numpy(), labor_unit, overhead_unit, tva, selling)
+    return {name: pd.DataFrame(np.broadcast_to(values, purchase.shape), index=purchase.index, columns=purchase.columns)
+            for name, values in res.items()}
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ---------------------- TABLE DE PRIX INDEXÉE ----------------------
+class PriceTable:
+    # Tarifs triés par (clé, prix) ; chaque clé pointe sur sa tranche de lignes,
+    # donc offers()/price() ne parcourent jamais la table complète.
+    def __init__(self, df: pd.DataFrame, key: str, price_col: str):
+        df = df.dropna(subset=[key]).copy()
+        df[price_col] = pd.to_numeric(df[price_col], errors="coerce")
+        df = df.sort_values([key, price_col], kind="mergesort", na_position="last").reset_index(drop=True)
+        keys = df[key].to_numpy()
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            stops = np.r_[starts[1:], len(keys)]
+            self._slices = dict(zip(keys[starts], zip(starts.tolist(), stops.tolist())))
+        else:
+            self._slices = {}
+        self.df = df
+        self.key = key
+        self.price_col = price_col
+
+    def offers(self, key) -> pd.DataFrame:
+        # toutes les offres de la clé, de la moins chère à la plus chère
+        start, stop = self._slices.get(key, (0, 0))
+        return self.df.iloc[start:stop]
+
+    def price(self, key, supplier, default=None):
+        offers = self.offers(key)
+        match = offers.loc[offers["Fournisseur"] == supplier, self.price_col]
+        return default if match.empty else float(match.iloc[0])
+
+    def best_offers(self, exclude_supplier=None) -> pd.DataFrame:
+        # meilleure offre (ligne complète) de chaque clé, éventuellement hors d'un fournisseur
+        df = self.df
+        if exclude_supplier is not None and "Fournisseur" in df.columns:
+            df = df[df["Fournisseur"] != exclude_supplier]
+        return df.dropna(subset=[self.price_col]).drop_duplicates(self.key)
+
+    def best_prices(self) -> pd.Series:
+        # meilleur prix de chaque clé (première ligne de chaque tranche)
+        starts = [start for start, _ in self._slices.values()]
+        best = self.df.iloc[starts]
+        return pd.Series(best[self.price_col].to_numpy(), index=best[self.key].to_numpy()).dropna()
+
+class PriceIndex:
+    def __init__(self, supplier_prices: pd.DataFrame, ingredient_prices: pd.DataFrame, suppliers: pd.DataFrame):
+        lead = suppliers[["Fournisseur", "Délai (j)"]].drop_duplicates("Fournisseur") if "Délai (j)" in suppliers.columns else None
+        self.products = PriceTable(_with_lead_time(supplier_prices, lead), "SKU", "Prix HT")
+        self.ingredients = PriceTable(_with_lead_time(ingredient_prices, lead), "Code ingrédient", "Prix HT / unité")
+
+def _with_lead_time(prices: pd.DataFrame, lead) -> pd.DataFrame:
+    if lead is None or "Fournisseur" not in prices.columns:
+        return prices
+    return prices.drop(columns=["Délai (j)"], errors="ignore").merge(lead, on="Fournisseur", how="left")
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_price_index(versions: tuple, _supplier_prices: pd.DataFrame, _ingredient_prices: pd.DataFrame,
+                    _suppliers: pd.DataFrame) -> PriceIndex:
+    # reconstruit uniquement quand la version de l'une des trois tables change (les tables elles-mêmes ne
+    # sont pas hachées) ; partagé (lecture seule) par tous les onglets
+    return PriceIndex(_supplier_prices, _ingredient_prices, _suppliers)
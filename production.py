@@ -0,0 +1,103 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# ---------------------- NOMENCLATURE À PLAT ----------------------
+def flatten_bom(recipes: pd.DataFrame) -> pd.DataFrame:
+    # (SKU, Ingrédient, Qté) avec les sous-recettes remplacées par leurs propres ingrédients,
+    # quantités multipliées à chaque niveau. Les lignes prises dans un cycle sont abandonnées.
+    rec = pd.DataFrame({
+        "SKU": recipes["SKU"],
+        "Ingrédient": recipes["Ingrédient"],
+        "Qté": pd.to_numeric(recipes["Qté par unité"], errors="coerce").fillna(0.0),
+    }).dropna(subset=["SKU", "Ingrédient"])
+    skus = pd.Index(rec["SKU"].unique())
+    parts = []
+    current = rec
+    for _ in range(len(skus) + 1):
+        is_sub = current["Ingrédient"].isin(skus)
+        parts.append(current[~is_sub])
+        sub = current[is_sub]
+        if sub.empty:
+            break
+        sub = sub.merge(rec, left_on="Ingrédient", right_on="SKU", suffixes=("", "_sub"))
+        current = pd.DataFrame({"SKU": sub["SKU"], "Ingrédient": sub["Ingrédient_sub"], "Qté": sub["Qté"] * sub["Qté_sub"]})
+    flat = pd.concat(parts, ignore_index=True)
+    return flat.groupby(["SKU", "Ingrédient"], as_index=False, sort=False)["Qté"].sum()
+
+# ---------------------- EXPLOSION DU PLAN ----------------------
+def explode_plan(plan: pd.DataFrame, recipes: pd.DataFrame, start: date, days: int):
+    # Besoins bruts jour × article pour le plan (Date, SKU, Quantité) sur [start, start + days[ :
+    # besoins = quantités planifiées (jours × SKU) @ nomenclature à plat (SKU × ingrédients).
+    # Les SKU sans recette sont des produits achetés : leur besoin est la quantité planifiée.
+    # Renvoie (besoins ingrédients, besoins produits achetés), index = dates du plan.
+    dates = pd.date_range(pd.Timestamp(start), periods=days, freq="D")
+    when = pd.to_datetime(plan["Date"], errors="coerce").dt.normalize()
+    qty = pd.to_numeric(plan["Quantité"], errors="coerce").fillna(0.0)
+    keep = when.isin(dates) & plan["SKU"].notna() & (qty != 0)
+    day_idx = dates.get_indexer(when[keep])
+    sku_codes, planned = pd.factorize(plan.loc[keep, "SKU"])
+
+    P = np.zeros((len(dates), len(planned)))
+    np.add.at(P, (day_idx, sku_codes), qty[keep].to_numpy())
+
+    flat = flatten_bom(recipes)
+    flat = flat[flat["SKU"].isin(planned)]
+    ing_codes, leaves = pd.factorize(flat["Ingrédient"])
+    M = np.zeros((len(planned), len(leaves)))
+    np.add.at(M, (planned.get_indexer(flat["SKU"]), ing_codes), flat["Qté"].to_numpy())
+
+    needs = pd.DataFrame(P @ M, index=dates, columns=leaves)
+    bought = ~planned.isin(recipes["SKU"])
+    bought_needs = pd.DataFrame(P[:, bought], index=dates, columns=planned[bought])
+    return needs, bought_needs
+
+# ---------------------- NETTING & COMMANDES ----------------------
+def purchase_orders(needs: pd.DataFrame, stock: pd.Series, offers: pd.DataFrame, today: date = None) -> pd.DataFrame:
+    # Besoin net = besoins du plan - stock. Commande chez la meilleure offre (offers : Code, Fournisseur,
+    # Prix HT, Conditionnement, MOQ, Délai (j)), au moins le MOQ, en conditionnements (colis) entiers,
+    # à passer "Délai (j)" jours avant le premier jour de rupture. Besoins, MOQ, conditionnement et
+    # prix sont exprimés dans l'unité de base (kg, L, pièce), comme dans les recettes.
+    if needs.empty:
+        return pd.DataFrame()
+    today = pd.Timestamp(today or date.today())
+    codes = needs.columns
+    stock = pd.to_numeric(stock, errors="coerce").groupby(level=0).sum().reindex(codes).fillna(0.0).to_numpy()
+    cum = needs.cumsum().to_numpy()
+    gross = cum[-1]
+    net = np.clip(gross - stock, 0.0, None)
+    short = cum > stock
+    first_short = np.where(short.any(axis=0), short.argmax(axis=0), -1)
+
+    out = pd.DataFrame({"Code": codes, "Besoin brut": gross, "Stock": stock, "Besoin net": net})
+    out = out[out["Besoin net"] > 0].copy()
+    out["Date besoin"] = needs.index[first_short[out.index]]
+    out = out.merge(offers, on="Code", how="left")
+
+    pack = out["Conditionnement"].where(out["Conditionnement"] > 0, 1.0).fillna(1.0)
+    wanted = np.maximum(out["Besoin net"], pd.to_numeric(out["MOQ"], errors="coerce").fillna(0.0))
+    packs = np.ceil(wanted / pack - 1e-9)
+    units = packs * pack
+    out["Colis"] = packs
+    out["Qté à commander"] = units
+    out["Montant HT"] = units * out["Prix HT"]
+    lead = pd.to_timedelta(out["Délai (j)"].fillna(0).astype(float), unit="D")
+    out["Date commande"] = out["Date besoin"] - lead
+    out["En retard"] = out["Date commande"] < today
+    out["Date besoin"] = out["Date besoin"].dt.date
+    out["Date commande"] = out["Date commande"].dt.date
+    cols = ["Fournisseur", "Code", "Besoin brut", "Stock", "Besoin net", "Conditionnement", "MOQ",
+            "Colis", "Qté à commander", "Prix HT", "Montant HT", "Délai (j)", "Date besoin", "Date commande", "En retard"]
+    return out[cols].sort_values(["Fournisseur", "Date commande", "Code"], na_position="last").reset_index(drop=True)
+
+def offers_table(best: pd.DataFrame, key: str, price_col: str) -> pd.DataFrame:
+    # meilleures offres (PriceTable.best_offers) au format attendu par purchase_orders
+    return pd.DataFrame({
+        "Code": best[key],
+        "Fournisseur": best["Fournisseur"],
+        "Prix HT": best[price_col],
+        "Conditionnement": pd.to_numeric(best["Qté / unité"], errors="coerce") if "Qté / unité" in best.columns else 1.0,
+        "MOQ": pd.to_numeric(best["MOQ"], errors="coerce") if "MOQ" in best.columns else np.nan,
+        "Délai (j)": pd.to_numeric(best["Délai (j)"], errors="coerce") if "Délai (j)" in best.columns else np.nan,
+    })
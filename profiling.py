@@ -0,0 +1,114 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# ---------------------- PROFILAGE DES RERUNS (optionnel) ----------------------
+# Activé par BOULANGERIE_PROFILE=1 ou ?profile=1 dans l'URL. Désactivé, l'appli utilise NULL_PROFILER
+# dont les méthodes ne font rien. DataFrame.copy est remplacé une seule fois, au premier rerun profilé,
+# et n'est jamais rétabli : plusieurs sessions tournent en parallèle (un thread chacune), et le
+# remplaçant ne compte que pour le thread dont le rerun est profilé.
+LOG_PATH = os.environ.get("BOULANGERIE_PROFILE_LOG", "profile_log.jsonl")
+
+_local = threading.local()  # profileur du rerun en cours (un thread de script par session)
+_original_copy = pd.DataFrame.copy
+_install_lock = threading.Lock()
+
+def _counting_copy(self, deep=True):
+    out = _original_copy(self, deep=deep)
+    prof = getattr(_local, "profiler", None)
+    if prof is not None and not getattr(_local, "measuring", False):
+        _local.measuring = True
+        try:
+            prof.copies += 1
+            prof.copied_bytes += int(out.memory_usage(index=True, deep=False).sum())
+        finally:
+            _local.measuring = False
+    return out
+
+def _install_counting_copy():
+    with _install_lock:
+        if pd.DataFrame.copy is not _counting_copy:
+            pd.DataFrame.copy = _counting_copy
+
+def profiling_enabled() -> bool:
+    if os.environ.get("BOULANGERIE_PROFILE", "") not in ("", "0"):
+        return True
+    return st.query_params.get("profile", "") not in ("", "0")
+
+class _NullProfiler:
+    _null = contextlib.nullcontext()
+
+    def span(self, kind: str, name: str):
+        return self._null
+
+    def checkpoint(self, name: str):
+        pass
+
+    def finish(self, section: str):
+        pass
+
+NULL_PROFILER = _NullProfiler()
+
+class Profiler:
+    # Étapes de premier niveau (checkpoint : temps écoulé depuis le précédent) et détails
+    # imbriqués (span : chargement d'une table, rendu d'un éditeur, sérialisation d'un export).
+    # Copies = appels à DataFrame.copy pendant l'étape, avec la taille des copies.
+    def __init__(self):
+        _install_counting_copy()
+        _local.profiler = self
+        self.copies = 0
+        self.copied_bytes = 0
+        self.rows = []
+        self._start = self._last = time.perf_counter()
+        self._last_counts = (0, 0)
+
+    def _record(self, kind, name, seconds, counts):
+        self.rows.append({
+            "Type": kind, "Étape": name, "ms": round(seconds * 1000, 1),
+            "Copies": self.copies - counts[0], "Mo copiés": round((self.copied_bytes - counts[1]) / 2**20, 2),
+        })
+
+    @contextlib.contextmanager
+    def span(self, kind: str, name: str):
+        t0, counts = time.perf_counter(), (self.copies, self.copied_bytes)
+        try:
+            yield
+        finally:
+            self._record(kind, name, time.perf_counter() - t0, counts)
+
+    def checkpoint(self, name: str):
+        now = time.perf_counter()
+        self._record("étape", name, now - self._last, self._last_counts)
+        self._last, self._last_counts = now, (self.copies, self.copied_bytes)
+
+    def finish(self, section: str):
+        self.checkpoint(section)
+        _local.profiler = None
+        total_ms = round((time.perf_counter() - self._start) * 1000, 1)
+        entry = {
+            "horodatage": datetime.now().isoformat(timespec="seconds"), "section": section, "total_ms": total_ms,
+            "copies": self.copies, "mo_copies": round(self.copied_bytes / 2**20, 2), "etapes": self.rows,
+        }
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        with st.sidebar:
+            st.markdown("### ⏱️ Profil du rerun")
+            st.metric("Durée totale", f"{total_ms:.0f} ms")
+            st.caption(f"{self.copies} copie(s) de DataFrame • {entry['mo_copies']} Mo copiés • journal : {LOG_PATH}")
+            df = pd.DataFrame(self.rows)
+            # étapes d'abord (elles se somment au total), puis les détails du plus lent au plus rapide
+            df = df.assign(_detail=df["Type"] != "étape").sort_values(["_detail", "ms"], ascending=[True, False])
+            st.dataframe(df.drop(columns="_detail"), use_container_width=True, hide_index=True)
+
+def get_profiler():
+    if profiling_enabled():
+        return Profiler()
+    _local.profiler = None  # rerun précédent interrompu par une exception
+    return NULL_PROFILER
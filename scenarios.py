@@ -0,0 +1,134 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from costing import RECIPE_SUPPLIER, best_ingredient_prices, compute_margin, labor_cost_per_unit, overhead_allocation_per_unit
+from production import flatten_bom
+
+# ---------------------- DÉFINITION D'UN SCÉNARIO ----------------------
+# Une définition est un tuple de tuples (hashable → clé de cache) :
+#   shocks   ((libellé, (codes ou préfixes d'ingrédients…), (variations %…)), …)
+#   wage     (hausses du taux horaire %…)           volume   (variations du volume mensuel %…)
+#   tva      (taux actuel visé, (nouveaux taux…))    price    (variations du prix de vente TTC %…)
+#   labor    (minutes / unité, taux horaire, charges %, prime €/h)
+#   overheads, monthly_volume
+def parse_values(text: str, default=(0.0,)) -> tuple:
+    # "−20 ; 0 ; 20" / "0,5;2" → (-20.0, 0.0, 20.0) ; valeurs illisibles ignorées, doublons retirés
+    values = []
+    for part in str(text).replace("−", "-").split(";"):
+        try:
+            value = float(part.strip().replace(",", "."))
+        except ValueError:
+            continue
+        if value not in values:
+            values.append(value)
+    return tuple(values) or tuple(default)
+
+def scenario_grid(definition: dict) -> pd.DataFrame:
+    # produit cartésien de toutes les variations : une ligne par scénario
+    dims = {}
+    for k, (label, _, values) in enumerate(definition["shocks"]):
+        dims[f"{label} %" if f"{label} %" not in dims else f"{label} ({k + 1}) %"] = values
+    dims.update({"Salaires %": definition["wage"], "Volume %": definition["volume"],
+                 "TVA %": definition["tva"][1], "Prix de vente %": definition["price"]})
+    rows = list(itertools.product(*dims.values()))
+    return pd.DataFrame(rows, columns=list(dims), dtype="float64")
+
+# ---------------------- COÛTS DE BASE PAR SKU ----------------------
+def _cost_components(products, recipes, supplier_prices, ingredient_prices, shocks):
+    # Coût d'achat actuel de chaque SKU décomposé en : part de chaque groupe d'ingrédients choqué
+    # (matrice SKU × groupes) + reste. Recette (nomenclature à plat) si elle existe, sinon meilleur tarif.
+    flat = flatten_bom(recipes)
+    contrib = flat["Ingrédient"].map(best_ingredient_prices(ingredient_prices)).fillna(0.0).to_numpy() * flat["Qté"].to_numpy()
+    bought = supplier_prices[supplier_prices["Fournisseur"] != RECIPE_SUPPLIER]
+    bought = pd.to_numeric(bought["Prix HT"], errors="coerce").groupby(bought["SKU"]).min().dropna()
+
+    catalogue = products.drop_duplicates("SKU").set_index("SKU")
+    with_recipe = pd.Index(flat["SKU"].unique())
+    skus = catalogue.index[catalogue.index.isin(with_recipe) | catalogue.index.isin(bought.index)]
+    line_sku = skus.get_indexer(flat["SKU"])
+    keep = line_sku >= 0
+
+    group = np.full(len(flat), -1)
+    leaves = flat["Ingrédient"].astype(str)
+    for k, (_, codes, _) in enumerate(shocks):
+        hit = leaves.str.startswith(tuple(codes)).to_numpy() if codes else np.zeros(len(flat), dtype=bool)
+        group[hit & (group < 0)] = k
+    shocked = np.zeros((len(skus), len(shocks)))
+    sel = keep & (group >= 0)
+    np.add.at(shocked, (line_sku[sel], group[sel]), contrib[sel])
+    total = np.bincount(line_sku[keep], weights=contrib[keep], minlength=len(skus))
+    rest = np.where(skus.isin(with_recipe), total - shocked.sum(axis=1), bought.reindex(skus).fillna(0.0).to_numpy())
+    return catalogue.loc[skus], rest, shocked
+
+# ---------------------- CALCUL EN LOT ----------------------
+class ScenarioResult:
+    # margin_ht / margin_pct : tenseurs scénarios × SKU (float32) ; grid : une ligne par scénario
+    def __init__(self, grid, catalogue, margin_ht, margin_pct, baseline_pct):
+        self.grid = grid
+        self.skus = catalogue.index
+        self.names = catalogue["Produit"].to_numpy()
+        self.margin_ht = margin_ht
+        self.margin_pct = margin_pct
+        self.baseline_pct = baseline_pct
+
+    def summary(self, target_pct: float) -> pd.DataFrame:
+        below = (self.margin_pct < target_pct).sum(axis=1)
+        return self.grid.assign(**{
+            "Marge moyenne %": self.margin_pct.mean(axis=1) if len(self.skus) else np.nan,
+            "Marge min %": self.margin_pct.min(axis=1) if len(self.skus) else np.nan,
+            "Produits sous la cible": below,
+        })
+
+    def products(self, scenario: int, target_pct: float) -> pd.DataFrame:
+        pct = self.margin_pct[scenario]
+        return pd.DataFrame({
+            "SKU": self.skus, "Produit": self.names,
+            "% marge actuelle": self.baseline_pct, "% marge scénario": pct,
+            "Écart (pts)": pct - self.baseline_pct, "Marge HT scénario": self.margin_ht[scenario],
+            "Sous la cible": pct < target_pct,
+        })
+
+def run_scenarios(products, recipes, supplier_prices, ingredient_prices, definition: dict,
+                  max_cells: int = 500_000) -> ScenarioResult:
+    # Marges de tous les SKU pour tous les scénarios : une multiplication de matrices pour les
+    # matières, puis compute_margin sur des blocs de scénarios (≤ max_cells cellules à la fois).
+    grid = scenario_grid(definition)
+    catalogue, rest, shocked = _cost_components(products, recipes, supplier_prices, ingredient_prices, definition["shocks"])
+    tva0 = pd.to_numeric(catalogue["TVA %"], errors="coerce").fillna(0.0).to_numpy()
+    ttc0 = pd.to_numeric(catalogue["Prix vente TTC"], errors="coerce").fillna(0.0).to_numpy()
+    minutes, rate, charges, prime = definition["labor"]
+    targeted = np.isclose(tva0, definition["tva"][0])
+
+    def margins(factors, wage, volume, tva, price):
+        # factors : scénarios × groupes ; les autres paramètres : un par scénario
+        purchase = rest + factors @ shocked.T
+        labor = labor_cost_per_unit(minutes, rate * (1 + wage / 100), charges, prime)[:, None]
+        overhead = overhead_allocation_per_unit(definition["overheads"], definition["monthly_volume"] * (1 + volume / 100))
+        tva_rates = np.where(targeted, tva[:, None], tva0)
+        res = compute_margin(purchase, labor, np.asarray(overhead)[:, None], tva_rates, ttc0 * (1 + price[:, None] / 100))
+        return (np.broadcast_to(res["Marge HT"], purchase.shape).astype("float32"),
+                np.broadcast_to(res["% marge sur PV HT"], purchase.shape).astype("float32"))
+
+    n_shocks = len(definition["shocks"])
+    values = grid.to_numpy()
+    factors = 1 + values[:, :n_shocks] / 100
+    wage, volume, tva, price = (values[:, n_shocks + i] for i in range(4))
+    margin_ht = np.empty((len(grid), len(catalogue)), dtype="float32")
+    margin_pct = np.empty_like(margin_ht)
+    step = max(1, max_cells // max(1, len(catalogue)))
+    for start in range(0, len(grid), step):
+        block = slice(start, start + step)
+        margin_ht[block], margin_pct[block] = margins(factors[block], wage[block], volume[block], tva[block], price[block])
+
+    zero = np.zeros(1)
+    _, baseline = margins(np.ones((1, n_shocks)), zero, zero, np.array([definition["tva"][0]]), zero)
+    return ScenarioResult(grid, catalogue, margin_ht, margin_pct, baseline[0])
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_scenarios(versions: tuple, _products, _recipes, _supplier_prices, _ingredient_prices,
+                  definition: tuple) -> ScenarioResult:
+    # une entrée par définition de scénario et par version des tables ; résultat partagé en lecture seule
+    return run_scenarios(_products, _recipes, _supplier_prices, _ingredient_prices, dict(definition))
@@ -0,0 +1,284 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from planning import RATE_COLUMNS
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+MAX_HOURS_COLUMN = "Heures max / sem."
+
+# ---------------------- ENTRÉES ----------------------
+def _minutes(hhmm: pd.Series) -> np.ndarray:
+    # "HH:MM" → minutes depuis minuit (NaN si illisible)
+    t = pd.to_datetime(hhmm.astype(str).str.strip(), format="%H:%M", errors="coerce")
+    return (t.dt.hour * 60 + t.dt.minute).to_numpy(dtype="float64")
+
+def _day_index(days: pd.Series) -> np.ndarray:
+    lookup = {d.lower(): i for i, d in enumerate(DAYS)}
+    return days.astype(str).str.strip().str.lower().map(lookup).fillna(-1).to_numpy(dtype=int)
+
+def _norm(values: pd.Series) -> np.ndarray:
+    return values.fillna("").astype(str).str.strip().str.lower().to_numpy()
+
+def hourly_costs(employees: pd.DataFrame) -> np.ndarray:
+    # coût chargé d'une heure : (taux horaire + prime) × (1 + charges), comme shift_costs
+    rates = employees.reindex(columns=RATE_COLUMNS).apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    return ((rates["Taux horaire €"] + rates["Prime €/h"]) * (1 + rates["Charges %"] / 100)).to_numpy()
+
+def build_positions(staffing: pd.DataFrame, start: date, weeks: int) -> pd.DataFrame:
+    # une ligne par personne requise : besoins (Jour, Rôle, Début, Fin, Effectif) répétés chaque semaine
+    begin, end = _minutes(staffing["Début"]), _minutes(staffing["Fin"])
+    need = pd.DataFrame({
+        "Jour": _day_index(staffing["Jour"]),
+        "Rôle": staffing["Rôle"].astype(str).str.strip().to_numpy(),
+        "Début": staffing["Début"].astype(str).str.strip().to_numpy(),
+        "Fin": staffing["Fin"].astype(str).str.strip().to_numpy(),
+        "start": begin,
+        "end": np.where(end <= begin, end + 24 * 60, end),  # passe minuit
+        "Effectif": pd.to_numeric(staffing["Effectif"], errors="coerce").fillna(0).astype(int).to_numpy(),
+    })
+    need = need[(need["Jour"] >= 0) & need["start"].notna() & need["end"].notna() & (need["Effectif"] > 0)]
+    need = need.loc[need.index.repeat(need["Effectif"])].drop(columns="Effectif")
+    monday = pd.Timestamp(start) - pd.Timedelta(days=pd.Timestamp(start).weekday())
+    weeks_df = pd.DataFrame({"Semaine": range(weeks)})
+    pos = need.merge(weeks_df, how="cross")
+    pos["Date"] = monday + pd.to_timedelta(pos["Semaine"] * 7 + pos["Jour"], unit="D")
+    pos["Heures"] = (pos["end"] - pos["start"]) / 60
+    return pos.sort_values(["Date", "start"], kind="mergesort").reset_index(drop=True)
+
+def eligibility(positions: pd.DataFrame, employees: pd.DataFrame, availability: pd.DataFrame) -> np.ndarray:
+    # positions × employés : même rôle, et créneau compris dans une disponibilité du jour.
+    # Un employé sans aucune ligne de disponibilité est disponible tous les jours.
+    ok = _norm(positions["Rôle"])[:, None] == _norm(employees["Rôle"])[None, :]
+    names = employees["Employé"].astype(str).to_numpy()
+    avail = pd.DataFrame({
+        "emp": pd.Index(names).get_indexer(availability["Employé"].astype(str)),
+        "Jour": _day_index(availability["Jour"]),
+        "start": _minutes(availability["Début"]),
+        "end": _minutes(availability["Fin"]),
+    })
+    avail["end"] = np.where(avail["end"] <= avail["start"], avail["end"] + 24 * 60, avail["end"])
+    avail = avail[(avail["emp"] >= 0) & (avail["Jour"] >= 0)].dropna()
+    constrained = np.zeros(len(names), dtype=bool)
+    constrained[avail["emp"].unique()] = True
+    covered = np.zeros_like(ok)
+    pos = positions.reset_index(drop=True).assign(pos=lambda d: d.index)[["pos", "Jour", "start", "end"]]
+    pairs = pos.merge(avail, on="Jour", suffixes=("", "_dispo"))
+    pairs = pairs[(pairs["start_dispo"] <= pairs["start"]) & (pairs["end_dispo"] >= pairs["end"])]
+    covered[pairs["pos"].to_numpy(), pairs["emp"].to_numpy(dtype=int)] = True
+    return ok & (covered | ~constrained[None, :])
+
+# ---------------------- RECHERCHE LOCALE ----------------------
+# Heuristique (pas de garantie d'optimum) : objectif = d'abord le nombre de postes couverts, puis le coût
+# chargé. Une semaine à la fois : au plus un shift par employé et par jour, heures ≤ plafond hebdomadaire.
+def _search(hours, day, elig, cost, max_hours, order, rounds, start=None):
+    # à partir de `start` (affectation partielle) ou de rien : glouton dans l'ordre `order` (employé le moins
+    # cher disponible), puis améliorations locales jusqu'à ce qu'aucun mouvement n'améliore plus la solution
+    n_pos, n_emp = elig.shape
+    assign = np.full(n_pos, -1)
+    left = max_hours.astype(float).copy()
+    occ = np.full((7, n_emp), -1)  # poste tenu par chaque employé chaque jour
+    eps = 1e-9
+
+    def free(p):
+        return elig[p] & (occ[day[p]] < 0) & (left >= hours[p] - eps)
+
+    def put(p, e):
+        assign[p] = e
+        left[e] -= hours[p]
+        occ[day[p], e] = p
+
+    def take(p):
+        e = assign[p]
+        assign[p] = -1
+        left[e] += hours[p]
+        occ[day[p], e] = -1
+        return e
+
+    def cheapest(cand):
+        return cand[np.lexsort((-left[cand], cost[cand]))[0]]
+
+    def fill(p):
+        cand = np.flatnonzero(free(p))
+        if len(cand):
+            put(p, cheapest(cand))
+        return len(cand) > 0
+
+    def eject(p):
+        # e prend p en passant à un collègue son shift du jour, ou un autre shift pour libérer des heures ;
+        # le collègue est cherché avant tout déplacement (ses heures et ses jours ne dépendent pas de e) ;
+        # spare[d] : plus grand reliquat d'heures d'un employé libre le jour d (borne pour écarter q d'emblée)
+        spare = np.where(occ < 0, left, -np.inf).max(axis=1)
+        if not (spare >= hours.min() - eps).any():
+            return False
+        for e in np.flatnonzero(elig[p])[np.argsort(cost[elig[p]], kind="stable")]:
+            same = occ[day[p], e]
+            shifts = [same] if same >= 0 else np.flatnonzero(assign == e)
+            for q in shifts:
+                if left[e] + hours[q] < hours[p] - eps or hours[q] > spare[day[q]] + eps:
+                    continue
+                others = np.flatnonzero(free(q))
+                others = others[others != e]
+                if len(others):
+                    take(q)
+                    put(p, e)
+                    put(q, cheapest(others))
+                    return True
+        return False
+
+    def trade(p):
+        # e lâche un de ses shifts (q) pour prendre p et un autre poste vide plus court : un poste de plus couvert.
+        # Seuls les employés dont les heures libérées peuvent loger p et le plus court poste vide sont essayés.
+        empty = assign < 0
+        empty[p] = False
+        if not empty.any():
+            return False
+        shortest = hours[empty].min()
+        done = assign >= 0
+        longest = np.zeros(n_emp)
+        np.maximum.at(longest, assign[done], hours[done])
+        for e in np.flatnonzero(elig[p] & (left + longest >= hours[p] + shortest - eps)):
+            same = occ[day[p], e]
+            shifts = [same] if same >= 0 else np.flatnonzero(assign == e)
+            for q in shifts:
+                rest = left[e] + hours[q] - hours[p]  # heures de e une fois q lâché et p pris
+                if rest < shortest - eps:
+                    continue
+                room = (empty & elig[:, e] & (hours <= rest + eps) & (day != day[p])
+                        & ((occ[day, e] < 0) | (day == day[q])))
+                room[q] = False
+                if room.any():
+                    cand = np.flatnonzero(room)
+                    take(q)
+                    put(p, e)
+                    put(cand[np.argmin(hours[cand])], e)
+                    return True
+        return False
+
+    def relocate(p):
+        # p passe à un employé libre moins cher
+        e = assign[p]
+        cand = np.flatnonzero(free(p) & (cost < cost[e] - eps))
+        if not len(cand):
+            return False
+        take(p)
+        put(p, cheapest(cand))
+        return True
+
+    def swap(p):
+        # échange de shifts p ↔ q avec un employé moins cher qui tient un shift plus court : il prend p,
+        # l'employé de p prend q (l'échange inverse est trouvé depuis q, inutile de le chercher ici)
+        e1 = assign[p]
+        q = np.flatnonzero((assign >= 0) & (hours < hours[p] - eps))
+        e2 = assign[q]
+        q, e2 = q[cost[e2] < cost[e1] - eps], e2[cost[e2] < cost[e1] - eps]
+        if not len(q):
+            return False
+        same_day = day[q] == day[p]
+        ok = (elig[p, e2] & elig[q, e1]
+              & (same_day | (occ[day[q], e1] < 0)) & (same_day | (occ[day[p], e2] < 0))
+              & (left[e2] + hours[q] - hours[p] >= -eps))
+        if not ok.any():
+            return False
+        k = np.flatnonzero(ok)[np.argmin(((cost[e2] - cost[e1]) * (hours[p] - hours[q]))[ok])]
+        q, e2 = q[k], e2[k]
+        take(p)
+        take(q)
+        put(p, e2)
+        put(q, e1)
+        return True
+
+    if start is not None:
+        for p in np.flatnonzero(start >= 0):
+            put(p, start[p])
+    for p in order:
+        if assign[p] < 0:
+            fill(p)
+    growing = True  # la dernière passe d'insertion a couvert au moins un poste de plus
+    for _ in range(rounds):
+        changed = False
+        if growing:
+            uncovered = np.flatnonzero(assign < 0)
+            for p in uncovered:
+                if assign[p] < 0:
+                    changed |= fill(p) or eject(p) or trade(p)
+            # plus rien ne rentre : les tours suivants ne font plus que baisser le coût (effectif insuffisant)
+            growing = (assign < 0).sum() < len(uncovered)
+        for p in np.argsort(-cost[np.maximum(assign, 0)] * hours, kind="stable"):
+            if assign[p] >= 0:
+                changed |= relocate(p) or swap(p)
+        if not changed:
+            break
+    return assign
+
+def _score(assign, hours, cost):
+    # plus de postes couverts, puis coût le plus bas (ordre lexicographique)
+    done = assign >= 0
+    return -int(done.sum()), round(float((cost[assign[done]] * hours[done]).sum()), 6)
+
+def _solve_week(hours, day, elig, cost, max_hours, rounds=30, kicks=30, seed=0):
+    # 1) plusieurs ordres de départ pour le glouton (postes les plus contraints, les plus courts, les plus
+    #    longs d'abord), on garde la meilleure solution ;
+    # 2) « ruine et reconstruction » : on retire tous les shifts de deux employés tirés au hasard, on
+    #    reconstruit, et on garde le résultat s'il est meilleur (au plus `kicks` essais, moins sur les gros
+    #    effectifs où chaque reconstruction coûte plus cher ; tirage reproductible)
+    scarcity = elig.sum(axis=1)
+    orders = [np.lexsort((-hours, scarcity)), np.lexsort((hours, scarcity)),
+              np.argsort(hours, kind="stable"), np.argsort(-hours, kind="stable")]
+    best, best_score = None, None
+    for order in orders:
+        assign = _search(hours, day, elig, cost, max_hours, order, rounds)
+        score = _score(assign, hours, cost)
+        if best_score is None or score < best_score:
+            best, best_score = assign, score
+    rng = np.random.default_rng(seed)
+    working = np.unique(best[best >= 0])
+    kicks = min(kicks, max(3, 3000 // len(hours))) if len(working) > 1 else 0
+    for _ in range(kicks):
+        ruined = rng.choice(working, size=2, replace=False)
+        start = np.where(np.isin(best, ruined), -1, best)
+        assign = _search(hours, day, elig, cost, max_hours, rng.permutation(len(hours)), rounds, start)
+        score = _score(assign, hours, cost)
+        if score < best_score:
+            best, best_score = assign, score
+            working = np.unique(best[best >= 0])
+    return best
+
+def auto_schedule(staffing: pd.DataFrame, employees: pd.DataFrame, availability: pd.DataFrame,
+                  start: date, weeks: int = 1, default_max_hours: float = 35.0):
+    # Planning sur `weeks` semaines à partir du lundi de `start` : le plus de postes couverts possible, au
+    # coût chargé le plus bas trouvé par la recherche locale (heuristique : ni l'un ni l'autre n'est garanti optimal).
+    # Renvoie (shifts au format de la table shifts, postes non couverts).
+    employees = employees.dropna(subset=["Employé"]).drop_duplicates("Employé", keep="last").reset_index(drop=True)
+    positions = build_positions(staffing, start, weeks)
+    empty = pd.DataFrame(columns=["Date", "Employé", "Rôle", "Début", "Fin"])
+    if positions.empty or employees.empty:
+        return empty, positions.assign(Date=positions["Date"].dt.date)[["Date", "Rôle", "Début", "Fin"]]
+    elig = eligibility(positions, employees, availability)
+    cost = hourly_costs(employees)
+    # plafond hebdomadaire de chaque employé ; vide (ou colonne absente d'une ancienne table) → valeur par défaut
+    max_hours = pd.to_numeric(employees.reindex(columns=[MAX_HOURS_COLUMN])[MAX_HOURS_COLUMN], errors="coerce")
+    max_hours = max_hours.fillna(default_max_hours).to_numpy()
+
+    # un employé n'est éligible qu'aux postes de son rôle : chaque (semaine, rôle) est résolu à part
+    assign = np.full(len(positions), -1)
+    pos_role, emp_role = _norm(positions["Rôle"]), _norm(employees["Rôle"])
+    hours, day = positions["Heures"].to_numpy(), positions["Jour"].to_numpy()
+    for (_, role), idx in positions.groupby(["Semaine", pos_role]).indices.items():
+        staff = np.flatnonzero(emp_role == role)
+        if len(staff):
+            found = _solve_week(hours[idx], day[idx], elig[np.ix_(idx, staff)], cost[staff], max_hours[staff])
+            assign[idx] = np.where(found >= 0, staff[np.maximum(found, 0)], -1)
+
+    done = assign >= 0
+    names = employees["Employé"].to_numpy()
+    planned = pd.DataFrame({
+        "Date": positions.loc[done, "Date"].dt.strftime("%Y-%m-%d").to_numpy(),
+        "Employé": names[assign[done]],
+        "Rôle": positions.loc[done, "Rôle"].to_numpy(),
+        "Début": positions.loc[done, "Début"].to_numpy(),
+        "Fin": positions.loc[done, "Fin"].to_numpy(),
+    })
+    missing = positions.loc[~done, ["Date", "Rôle", "Début", "Fin"]].assign(Date=lambda d: d["Date"].dt.date)
+    return planned, missing.reset_index(drop=True)
@@ -0,0 +1,141 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+# ---------------------- STOCKAGE SQLITE (optionnel) ----------------------
+# Une table SQL par DataFrame ; "id" (rowid) identifie chaque ligne, ce qui permet d'écrire
+# seulement les lignes modifiées au lieu de réécrire tout le fichier.
+INDEXED_COLUMNS = ["SKU", "Code ingrédient", "Ingrédient", "Employé", "Date"]
+SQL_TYPES = {"str": "TEXT", "float64": "REAL", "Int64": "INTEGER"}
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_type(dtype) -> str:
+    if str(dtype) in SQL_TYPES:
+        return SQL_TYPES[str(dtype)]
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def _py(value):
+    # valeurs pandas/NumPy → types acceptés par sqlite3
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+class SQLiteStore:
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self.connect()) as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS "_meta" (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+
+    def connect(self) -> sqlite3.Connection:
+        # une connexion par opération : les reruns Streamlit tournent dans des threads différents
+        return sqlite3.connect(self.path)
+
+    def has_table(self, name: str) -> bool:
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+        return row is not None
+
+    def version(self, name: str) -> int:
+        with closing(self.connect()) as conn:
+            row = conn.execute('SELECT version FROM "_meta" WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, conn, name: str):
+        conn.execute('INSERT INTO "_meta" (name, version) VALUES (?, 1) '
+                     'ON CONFLICT(name) DO UPDATE SET version = version + 1', (name,))
+
+    def _columns(self, conn, name: str) -> list:
+        return [r[1] for r in conn.execute(f"PRAGMA table_info({_q(name)})") if r[1] != "id"]
+
+    def write_table(self, name: str, df: pd.DataFrame, dtypes: dict = None):
+        # (re)crée la table complète : utilisé pour l'import initial depuis les CSV
+        dtypes = dtypes or {}
+        cols = list(df.columns)
+        col_defs = ", ".join(f"{_q(c)} {_sql_type(dtypes.get(c, df[c].dtype))}" for c in cols)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_q(name)}")
+            conn.execute(f"CREATE TABLE {_q(name)} (id INTEGER PRIMARY KEY, {col_defs})")
+            for c in cols:
+                if c in INDEXED_COLUMNS:
+                    conn.execute(f"CREATE INDEX {_q(f'ix_{name}_{c}')} ON {_q(name)} ({_q(c)})")
+            conn.executemany(
+                f"INSERT INTO {_q(name)} ({', '.join(map(_q, cols))}) VALUES ({', '.join('?' * len(cols))})",
+                ([_py(v) for v in row] for row in df.itertuples(index=False, name=None)),
+            )
+            self._bump(conn, name)
+
+    def read_table(self, name: str, dtypes: dict = None) -> pd.DataFrame:
+        with closing(self.connect()) as conn:
+            df = pd.read_sql_query(f"SELECT * FROM {_q(name)} ORDER BY id", conn, index_col="id")
+        numeric = {c: t for c, t in (dtypes or {}).items() if c in df.columns and t != "str"}
+        return df.astype(numeric) if numeric else df
+
+    def apply_changes(self, name: str, edited: dict = None, added: list = None, deleted: list = None):
+        # Écritures ligne à ligne, dans une seule transaction :
+        #   edited  {id: {colonne: valeur}}, added [{colonne: valeur}], deleted [id]
+        with closing(self.connect()) as conn, conn:
+            known = set(self._columns(conn, name))
+            for row_id, values in (edited or {}).items():
+                values = {c: v for c, v in values.items() if c in known}
+                if values:
+                    sets = ", ".join(f"{_q(c)} = ?" for c in values)
+                    conn.execute(f"UPDATE {_q(name)} SET {sets} WHERE id = ?", [*map(_py, values.values()), int(row_id)])
+            for values in added or []:
+                values = {c: v for c, v in values.items() if c in known}
+                if values:
+                    conn.execute(f"INSERT INTO {_q(name)} ({', '.join(map(_q, values))}) VALUES ({', '.join('?' * len(values))})",
+                                 [_py(v) for v in values.values()])
+            if deleted:
+                conn.executemany(f"DELETE FROM {_q(name)} WHERE id = ?", [(int(i),) for i in deleted])
+            self._bump(conn, name)
+
+    def upsert_rows(self, name: str, df: pd.DataFrame, keys: list):
+        # Import en masse, une transaction par appel : ligne dont la clé existe → colonnes fournies
+        # mises à jour ; sinon insérée. Renvoie (insérées, mises à jour).
+        inserted = updated = 0
+        with closing(self.connect()) as conn, conn:
+            # index sur la clé complète : sinon SQLite choisit un index à une colonne (ex. Employé) et
+            # parcourt toutes les lignes de cet employé pour chaque ligne importée
+            index_name = _q(f"ix_{name}_{'_'.join(keys)}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {_q(name)} ({', '.join(map(_q, keys))})")
+            known = set(self._columns(conn, name))
+            cols = [c for c in df.columns if c in known]
+            others = [c for c in cols if c not in keys]
+            where = " AND ".join(f"{_q(k)} = ?" for k in keys)
+            if others:
+                find = f"UPDATE {_q(name)} SET {', '.join(f'{_q(c)} = ?' for c in others)} WHERE {where}"
+            else:
+                find = f"SELECT 1 FROM {_q(name)} WHERE {where}"
+            insert = f"INSERT INTO {_q(name)} ({', '.join(map(_q, cols))}) VALUES ({', '.join('?' * len(cols))})"
+            pos = {c: i for i, c in enumerate(cols)}
+            for row in df[cols].itertuples(index=False, name=None):
+                row = [_py(v) for v in row]
+                key_values = [row[pos[k]] for k in keys]
+                if others:
+                    found = conn.execute(find, [row[pos[c]] for c in others] + key_values).rowcount > 0
+                else:
+                    found = conn.execute(find, key_values).fetchone() is not None
+                if found:
+                    updated += 1
+                else:
+                    conn.execute(insert, row)
+                    inserted += 1
+            self._bump(conn, name)
+        return inserted, updated
+
+    def apply_editor_changes(self, name: str, shown: pd.DataFrame, state: dict):
+        # diff de st.data_editor (positions de lignes dans `shown`) → ids SQLite
+        ids = shown.index
+        self.apply_changes(
+            name,
+            edited={ids[int(pos)]: values for pos, values in state.get("edited_rows", {}).items()},
+            added=state.get("added_rows", []),
+            deleted=[ids[int(pos)] for pos in state.get("deleted_rows", [])],
+        )
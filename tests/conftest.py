@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules de l'application à plat, à côté de app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
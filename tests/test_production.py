@@ -0,0 +1,39 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from production import purchase_orders
+
+TODAY = date(2024, 3, 4)
+
+def orders_for(code, need, pack, moq, price, stock=0.0):
+    needs = pd.DataFrame({code: [need]}, index=pd.DatetimeIndex([pd.Timestamp(TODAY)]))
+    offers = pd.DataFrame({"Code": [code], "Fournisseur": ["F"], "Prix HT": [price], "Conditionnement": [pack],
+                           "MOQ": [moq], "Délai (j)": [0]})
+    return purchase_orders(needs, pd.Series({code: stock}), offers, TODAY).iloc[0]
+
+def test_amount_uses_price_per_base_unit_times_pack_size():
+    # 100 kg de farine en sacs de 25 kg à 0,80 €/kg : 4 sacs, 100 kg, 80 €
+    row = orders_for("FARINE", 100.0, 25.0, None, 0.80)
+    assert row["Colis"] == 4
+    assert row["Qté à commander"] == pytest.approx(100.0)
+    assert row["Montant HT"] == pytest.approx(80.0)
+
+def test_partial_pack_is_rounded_up():
+    row = orders_for("FARINE", 110.0, 25.0, None, 0.80)
+    assert row["Colis"] == 5
+    assert row["Montant HT"] == pytest.approx(100.0)
+
+def test_moq_is_a_minimum_not_a_lot_multiple():
+    # besoin 130 croissants, MOQ 80 : on commande 130, pas 160
+    assert orders_for("CRO-BA", 130.0, 1.0, 80.0, 0.42)["Qté à commander"] == pytest.approx(130.0)
+    # besoin inférieur au MOQ : on commande le MOQ
+    row = orders_for("CRO-BA", 30.0, 1.0, 80.0, 0.42)
+    assert row["Qté à commander"] == pytest.approx(80.0)
+    assert row["Montant HT"] == pytest.approx(80 * 0.42)
+
+def test_stock_is_netted_before_ordering():
+    row = orders_for("BEURRE", 12.0, 1.0, None, 7.20, stock=5.0)
+    assert row["Besoin net"] == pytest.approx(7.0)
+    assert row["Montant HT"] == pytest.approx(7 * 7.20)
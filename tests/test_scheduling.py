@@ -0,0 +1,125 @@
+import itertools
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scheduling import _solve_week, auto_schedule, hourly_costs
+from planning import shift_hours
+
+MONDAY = date(2024, 3, 4)
+
+def employees(*rows):
+    return pd.DataFrame([{"Employé": name, "Rôle": role, "Taux horaire €": rate, "Prime €/h": 0.0, "Charges %": 0.0,
+                          "Heures max / sem.": cap} for name, role, rate, cap in rows])
+
+def staffing(*rows):
+    return pd.DataFrame([{"Jour": day, "Rôle": role, "Début": start, "Fin": end, "Effectif": n}
+                         for day, role, start, end, n in rows])
+
+NO_AVAILABILITY = pd.DataFrame(columns=["Employé", "Jour", "Début", "Fin"])
+
+def check_constraints(planned, emps):
+    hours = planned.assign(Heures=shift_hours(planned["Début"], planned["Fin"]))
+    caps = emps.set_index("Employé")["Heures max / sem."]
+    week = pd.to_datetime(hours["Date"]).dt.isocalendar().week
+    per_week = hours.groupby([week, "Employé"])["Heures"].sum()
+    assert (per_week <= caps.reindex(per_week.index.get_level_values("Employé")).to_numpy() + 1e-9).all()
+    assert not hours.duplicated(["Date", "Employé"]).any()
+    roles = emps.set_index("Employé")["Rôle"]
+    assert (hours["Rôle"].to_numpy() == roles.reindex(hours["Employé"]).to_numpy()).all()
+
+def test_short_slots_are_preferred_when_they_cover_more():
+    # E1 seul, 8 h : lundi 6 h ×2, mardi et mercredi 4 h ×2 → mardi + mercredi (2 postes) plutôt que lundi (1)
+    emps = employees(("E1", "A", 12.0, 8.0))
+    need = staffing(("Lundi", "A", "08:00", "14:00", 2), ("Mardi", "A", "08:00", "12:00", 2),
+                    ("Mercredi", "A", "08:00", "12:00", 2))
+    planned, missing = auto_schedule(need, emps, NO_AVAILABILITY, MONDAY)
+    assert len(planned) == 2
+    assert sorted(planned["Date"]) == ["2024-03-05", "2024-03-06"]
+    check_constraints(planned, emps)
+
+def test_full_cover_is_found_when_the_cheapest_employee_must_skip_the_long_slot():
+    # le glouton donnerait lundi (6 h) à E1, le moins cher, et mercredi resterait vide
+    emps = employees(("E1", "A", 12.0, 8.0), ("E2", "A", 15.0, 6.0))
+    need = staffing(("Lundi", "A", "08:00", "14:00", 1), ("Mardi", "A", "08:00", "12:00", 1),
+                    ("Mercredi", "A", "08:00", "12:00", 1))
+    planned, missing = auto_schedule(need, emps, NO_AVAILABILITY, MONDAY)
+    assert missing.empty
+    assert planned.set_index("Date")["Employé"].to_dict() == {"2024-03-04": "E2", "2024-03-05": "E1", "2024-03-06": "E1"}
+    check_constraints(planned, emps)
+
+def test_roles_availability_and_caps_over_several_weeks():
+    emps = employees(("Alice", "Boulangère", 14.0, 35.0), ("Bruno", "Vente", 12.0, 20.0), ("Chloé", "Vente", 11.0, 12.0))
+    need = staffing(*[(day, role, start, end, 1) for day in ["Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+                      for role, start, end in [("Boulangère", "05:00", "12:00"), ("Vente", "07:00", "13:00")]])
+    availability = pd.DataFrame([{"Employé": "Chloé", "Jour": "Samedi", "Début": "06:00", "Fin": "14:00"},
+                                 {"Employé": "Chloé", "Jour": "Mardi", "Début": "09:00", "Fin": "14:00"}])
+    planned, missing = auto_schedule(need, emps, availability, MONDAY, weeks=2)
+    check_constraints(planned, emps)
+    chloe = planned[planned["Employé"] == "Chloé"]
+    assert set(pd.to_datetime(chloe["Date"]).dt.weekday) <= {5}  # mardi 07:00 hors de sa disponibilité
+    # Vente : 5 postes de 6 h par semaine ; Bruno (20 h) en tient 3, Chloé le samedi → 1 poste manquant par semaine
+    assert len(missing) == 2 and set(missing["Rôle"]) == {"Vente"}
+    assert len(planned) == 2 * 5 + 2 * 4
+
+def test_cost_uses_loaded_hourly_rate():
+    emps = pd.DataFrame({"Taux horaire €": [12.0], "Prime €/h": [1.0], "Charges %": [40.0]})
+    assert hourly_costs(emps)[0] == pytest.approx(13.0 * 1.4)
+
+def brute_force_coverage(hours, day, elig, cap):
+    best = 0
+    options = [[-1] + list(np.flatnonzero(elig[p])) for p in range(len(hours))]
+    for a in itertools.product(*options):
+        a = np.array(a)
+        ok = all(hours[a == e].sum() <= cap[e] + 1e-9 and len(set(day[a == e])) == (a == e).sum()
+                 for e in range(elig.shape[1]))
+        if ok:
+            best = max(best, int((a >= 0).sum()))
+    return best
+
+@pytest.mark.parametrize("seed", range(40))
+def test_small_random_weeks_respect_constraints_and_reach_maximum_coverage(seed):
+    rng = np.random.default_rng(seed)
+    n_emp, n_pos = rng.integers(2, 4), rng.integers(4, 7)
+    hours = rng.choice([3.0, 4.0, 6.0, 8.0], n_pos)
+    day = rng.integers(0, 4, n_pos)
+    elig = rng.random((n_pos, n_emp)) < 0.8
+    cost = rng.uniform(15, 30, n_emp)
+    cap = rng.choice([8.0, 10.0, 12.0], n_emp)
+    assign = _solve_week(hours, day, elig, cost, cap)
+    for e in range(n_emp):
+        assert hours[assign == e].sum() <= cap[e] + 1e-9
+        assert len(set(day[assign == e])) == (assign == e).sum()
+    assert all(elig[p, assign[p]] for p in np.flatnonzero(assign >= 0))
+    assert (assign >= 0).sum() == brute_force_coverage(hours, day, elig, cap)
+
+def test_understaffed_weeks_stay_fast_and_leave_no_fillable_gap():
+    # 30 vendeurs pour ~50 postes par jour sur 4 semaines : la plupart des postes restent vides ;
+    # la recherche ne doit pas s'enliser à tenter chaque échange pour chacun d'eux
+    rng = np.random.default_rng(0)
+    emps = employees(*[(f"E{i}", "Vente", float(rate), float(cap)) for i, (rate, cap)
+                       in enumerate(zip(rng.uniform(11, 16, 30).round(2), rng.choice([20, 28, 35], 30)))])
+    slots = [("06:00", "12:00"), ("07:00", "13:00"), ("09:00", "13:00"), ("12:00", "19:00"), ("14:00", "20:00"),
+             ("16:00", "20:00")]
+    need = staffing(*[(day, "Vente", start, end, 8) for day in ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi",
+                                                                "Samedi", "Dimanche"] for start, end in slots])
+    t0 = time.perf_counter()
+    planned, missing = auto_schedule(need, emps, NO_AVAILABILITY, MONDAY, weeks=4)
+    assert time.perf_counter() - t0 < 10
+    assert len(planned) + len(missing) == 4 * 7 * 6 * 8
+    check_constraints(planned, emps)
+    # aucun poste vide ne peut être pris tel quel par un employé libre ce jour-là avec assez d'heures
+    hours = planned.assign(Heures=shift_hours(planned["Début"], planned["Fin"]),
+                           Semaine=pd.to_datetime(planned["Date"]).dt.isocalendar().week)
+    used = hours.groupby(["Semaine", "Employé"])["Heures"].sum()
+    missing = missing.assign(Heures=shift_hours(missing["Début"], missing["Fin"]),
+                             Semaine=pd.to_datetime(missing["Date"]).dt.isocalendar().week)
+    busy = set(zip(planned["Date"], planned["Employé"]))
+    caps = emps.set_index("Employé")["Heures max / sem."]
+    for row in missing.itertuples(index=False):
+        for name, cap in caps.items():
+            if (str(row.Date), name) not in busy:
+                assert cap - used.get((row.Semaine, name), 0.0) < row.Heures - 1e-9